@@ -0,0 +1,729 @@
+#!/usr/bin/env python
+
+"""
+Micro benchmarks for cqutils.
+
+Run all benchmarks, or some of them by name:
+
+    python3 bench.py
+    python3 bench.py cache_hit
+
+Benchmarks use a temporary cq_cache directory, not the one used by scripts.
+"""
+
+from functools import partial
+import os
+import sys
+import tempfile
+import time
+
+src_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "src")
+sys.path.insert(0, src_dir)
+os.environ["CQ_CACHE_DIR"] = tempfile.mkdtemp(prefix="cq-cache-bench-")
+
+
+def timeit(func, repeat=5):
+    """Best wall time of func() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def table(header, rows):
+    widths = [max(len(str(r[i])) for r in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        cells = [
+            str(c).rjust(w) if i else str(c).ljust(w)
+            for i, (c, w) in enumerate(zip(row, widths))
+        ]
+        print("  ".join(cells))
+
+
+def ms(value):
+    return f"{value:.2f}ms"
+
+
+def bench_cache_hit():
+    """cq_cache hit latency of connectors and magnet slots used across the repo"""
+    import cadquery as cq
+    import cqutils
+    import magnet
+
+    connect = partial(cqutils.connect_obj, 6.4, 18, 2.4, edge_outline=2.6)
+    cases = {
+        "connect_obj(male)": partial(connect, kind=0),
+        "connect_obj(cut)": partial(connect, kind=2),
+        "connect_obj(female)": partial(connect, kind="female"),
+        "magnet2510": magnet.magnet2510,
+        "magnet_2_10_20": partial(magnet.magnet_2_10_20, hole_depth=0.4),
+        "magnet31060": magnet.magnet31060,
+    }
+    store = cqutils.cache_store()
+    rows = []
+    for name, func in cases.items():
+        miss = timeit(func, repeat=1)
+
+        def disk_hit():
+            store.clear_memory()
+            func()
+
+        # What a hit used to cost: parse a text BREP, then union it into an
+        # empty Workplane.
+        brep = func().val().wrapped
+
+        def text_brep_hit():
+            import io
+
+            buf = io.BytesIO()
+            cq.Shape(brep).exportBrep(buf)
+            buf.seek(0)
+            shape = cq.Shape.importBrep(buf)
+            cq.Workplane().union(cq.Workplane(obj=shape))
+
+        rows.append(
+            [
+                name,
+                ms(miss),
+                ms(timeit(text_brep_hit)),
+                ms(timeit(disk_hit)),
+                ms(timeit(func)),
+            ]
+        )
+    table(["case", "miss", "text brep + union", "disk hit", "memory hit"], rows)
+
+
+def bench_booleans():
+    """sequential union/cut vs one multi-operand union_all/cut_all"""
+    from functools import reduce
+
+    import cqutils
+    from cqutils import W
+    import magnet
+
+    slot = W().box(3, 30, 20)
+    plate = W().box(140, 96, 3)
+    slots = [slot.translate((i * 4 - 64, 0, 0)) for i in range(32)]
+    magnet_cut = magnet.magnet_2_10_20(hole_depth=0.4).translate((0, 0, 40))
+    magnets = [magnet_cut.rotate_axis("Y", a) for a in range(0, 360, 90)]
+    ring = W().cylinder(30, 6).cut(W().cylinder(20, 6))
+    rings = [ring.translate((0, 0, z)) for z in range(0, 100, 10)]
+    rod = W().box(200, 20, 20)
+    holes = [W().cylinder(40, 1).translate((x, 0, 0)) for x in range(-90, 100, 10)]
+    cases = {
+        "cut 32 slots": (plate, slots),
+        "cut 4 magnets": (W().box(100, 3, 100), magnets),
+        "union 10 rings": (None, rings),
+        "cut 19 holes": (rod, holes),
+    }
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, (obj, tools) in cases.items():
+        if obj is None:
+            sequential = lambda: reduce(lambda a, b: a.union(b), tools)
+            multi = lambda: cqutils.union_all(tools)
+        else:
+            sequential = lambda: reduce(lambda a, b: a.cut(b), tools, obj)
+            multi = lambda: obj.cut_all(tools)
+        before, after = timeit(sequential, repeat=3), timeit(multi, repeat=3)
+        rows.append([name, ms(before), ms(after), f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["case", "sequential", "multi-operand", "speedup"], rows)
+
+
+def bench_disjoint():
+    """fusing parts laid out apart, and cutting with tools that miss"""
+    import cqutils
+    from cqutils import W
+
+    plate = W().box(60, 4, 70).edges("|Y").fillet(5).faces(">Y").workplane().hole(20)
+    plates = [plate.translate((i * 70, 0, 0)) for i in range(3)]
+    holes = [W().cylinder(10, 1).translate((x, 30, 0)) for x in range(0, 200, 10)]
+
+    def fuse_plates():
+        shapes = [p.val() for p in plates]
+        return shapes[0].fuse(*shapes[1:]).clean()
+
+    def cut_holes():
+        from OCP.BRepAlgoAPI import BRepAlgoAPI_Cut
+
+        # Shape.cut would drop the tools, so run the boolean directly.
+        base = plates[0].val()
+        tools = [h.val() for h in holes]
+        return base._bool_op((base,), tools, BRepAlgoAPI_Cut()).clean()
+
+    def prefiltered(func):
+        # Bounding boxes are computed again, as for parts built once.
+        cqutils._bounding_boxes.clear()
+        return func().val()
+
+    cases = {
+        "union 3 plates apart": (fuse_plates, lambda: cqutils.union_all(plates)),
+        "cut 20 missing holes": (cut_holes, lambda: plates[0].cut_all(holes)),
+    }
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, (before, after) in cases.items():
+        after = partial(prefiltered, after)
+        same = abs(before().Volume() - after().Volume()) < 1e-6
+        before, after = timeit(before, repeat=3), timeit(after, repeat=3)
+        row = [name, ms(before), ms(after), f"{before / after:.1f}x"]
+        rows.append(row + [str(same).lower()])
+    cqutils.memoize(memoized)
+    table(["case", "boolean", "prefiltered", "speedup", "same volume"], rows)
+
+
+def bench_glue():
+    """fusing boxes that share faces, generic fuse vs glue option"""
+    import cqutils
+    from cqutils import W
+
+    def steps(n, size=8):
+        # As in bicolor_gradient_calibration.render()
+        return [
+            W()
+            .box(size, size, (i * n + j) * 0.08 + 0.4, centered=False)
+            .translate((i * size, j * size, 0))
+            for i in range(n)
+            for j in range(n)
+        ]
+
+    # As in epd_frame.get_bottom_obj()
+    bar = W().box(215, 14, 2)
+    corner = W().box(10, 14, 11).align(bar, ":>Z <X")
+    cases = {
+        "4x4 steps": steps(4),
+        "8x8 steps": steps(8),
+        "bar + 2 corners": [bar, corner, corner.align(bar, ">X")],
+    }
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, objs in cases.items():
+        before = timeit(lambda: cqutils.union_all(objs, glue=False), repeat=3)
+        after = timeit(lambda: cqutils.union_all(objs), repeat=3)
+        rows.append([name, ms(before), ms(after), f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["case", "fuse", "glue", "speedup"], rows)
+
+
+def bench_clean():
+    """boolean chains cleaning at every step vs once at the end"""
+    import cqutils
+    from cqutils import W
+
+    def quarter_frame():
+        # As in curtain_track_full.create_quarter_frame(), one step at a time.
+        box = W().center(105, 105).box(210, 210, 22)
+        obj = W().cylinder(22, 210).intersect(box).cut(W().cylinder(22, 190))
+        for r, h in [(193, 2), (197, 8), (199, 12)]:
+            ring = W().cylinder(h, r + 10).cut(W().cylinder(h, r))
+            obj = obj.cut(ring.translate((0, 0, 11 - h / 2)))
+        for i in range(12):
+            rib = W().box(3.6, 20, 2, centered=False).translate((0, 191, 9))
+            obj = obj.union(rib.rotate((0, 0, 0), (0, 0, 1), -90 / 13 * (i + 1)))
+        return obj
+
+    def side():
+        # As in epd_frame.get_side_obj()
+        bar = W().box(2, 14, 300)
+        obj = bar
+        conn = W().box(18, 6.4, 8).align(bar, "<Z :>X >Y")
+        for z in [0, 0.25, 0.5, 0.75, 1]:
+            obj = obj.union(conn.translate((0, 0, (300 - 8) * z)))
+        return obj.union(W().box(10, 2, 300).align(bar, "<Y :>X >Z"))
+
+    def deferred(func):
+        with cqutils.deferred_clean():
+            obj = func()
+        return cqutils._finish_clean(obj)
+
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, func in {"quarter frame": quarter_frame, "side": side}.items():
+        cleaned, unified = func().val(), deferred(func).val()
+        same = (
+            all(
+                len(getattr(cleaned, n)()) == len(getattr(unified, n)())
+                for n in ("Solids", "Faces", "Edges", "Vertices")
+            )
+            and abs(cleaned.Volume() - unified.Volume()) < 1e-6
+        )
+        before, after = timeit(func, repeat=3), timeit(
+            partial(deferred, func), repeat=3
+        )
+        rows.append(
+            [name, ms(before), ms(after), f"{before / after:.1f}x", str(same).lower()]
+        )
+    cqutils.memoize(memoized)
+    table(["chain", "clean each step", "clean once", "speedup", "same topology"], rows)
+
+
+def bench_lazy():
+    """eager chains vs the same chains built as Lazy expressions"""
+    import cqutils
+    from cqutils import W
+
+    plate = W().box(100, 100, 4)
+    bosses = [W().cylinder(8, 4).translate((x, 30, 4)) for x in range(-40, 50, 10)]
+    holes = [W().cylinder(20, 1.5).translate((x, -30, 0)) for x in range(-40, 50, 10)]
+
+    def one_at_a_time(obj):
+        for boss in bosses:
+            obj = obj.union(boss)
+        for hole in holes:
+            obj = obj.cut(hole)
+        return obj
+
+    def repeated(obj):
+        # As in tube_connector.interna1_obj(): the same slots, twice.
+        for _ in range(2):
+            obj = cqutils.union_all([obj, *bosses]).cut_all(holes)
+        return obj
+
+    def copies(obj):
+        # The same assembly at three heights: the moves are hoisted, and the
+        # assembly is fused once.
+        wrap = cqutils.lazy if isinstance(obj, cqutils.Lazy) else lambda o: o
+        parts = [obj, *map(wrap, bosses)]
+        return cqutils.union_all(
+            cqutils.union_all([p.translate((0, 0, z)) for p in parts])
+            for z in (0, 50, 100)
+        )
+
+    rows = []
+    memoized = cqutils.memoize(False)
+    chains = {"one at a time": one_at_a_time, "repeated": repeated, "copies": copies}
+    for name, chain in chains.items():
+        eager = timeit(lambda: chain(plate).val(), repeat=3)
+        # New leaves each time, so nothing is reused across repeats.
+        lazy = timeit(
+            lambda: chain(cqutils.lazy(plate.translate((0, 0, 0)))).val(), repeat=3
+        )
+        rows.append([name, ms(eager), ms(lazy), f"{eager / lazy:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["chain", "eager", "lazy", "speedup"], rows)
+
+
+def bench_lazy_empty():
+    """eager and Lazy results of booleans with empty operands"""
+    import cqutils
+    from cqutils import W
+
+    box = W().box(10, 10, 10)
+    chains = {
+        "intersect empty": lambda obj: obj.intersect(W()),
+        "intersect, then empty": lambda obj: obj.intersect(box).intersect(W()),
+        "cut empty and box": lambda obj: obj.cut_all([W(), W().box(5, 5, 20)]),
+    }
+
+    def outcome(func):
+        try:
+            return f"{func().val().Volume():.2f}mm3"
+        except Exception as e:
+            return type(e).__name__
+
+    rows = []
+    for name, chain in chains.items():
+        eager = outcome(lambda: chain(box))
+        lazy = outcome(lambda: chain(cqutils.lazy(box)))
+        rows.append([name, eager, lazy, str(eager == lazy).lower()])
+    table(["chain", "eager", "lazy", "same"], rows)
+
+
+def bench_memo():
+    """building the same part again in one process, with and without memoize()"""
+    import cqutils
+    from cqutils import W
+
+    def side():
+        # As in epd_frame.get_side_obj(), called for both sides of the frame.
+        bar = W().box(2, 14, 300)
+        conns = [W().box(18, 6.4, 8).translate((0, 0, z)) for z in range(0, 300, 60)]
+        holes = [W().cylinder(20, 1.5).translate((0, 0, z)) for z in range(0, 300, 20)]
+        return cqutils.union_all([bar, *conns]).cut_all(holes).val()
+
+    def quarter_rib():
+        # As in curtain_track_full.create_quarter_frame(): the same ribs for
+        # every quarter.
+        obj = W().cylinder(22, 210).cut(W().cylinder(22, 190))
+        rib = W().box(3.6, 20, 2, centered=False).translate((0, 191, 9))
+        for i in range(12):
+            obj = obj.union(rib.rotate((0, 0, 0), (0, 0, 1), -90 / 13 * (i + 1)))
+        return obj.val()
+
+    rows = []
+    for name, func in {"side": side, "quarter ribs": quarter_rib}.items():
+
+        def twice(enabled):
+            memoized = cqutils.memoize(enabled)
+            try:
+                return func().isSame(func())
+            finally:
+                cqutils.memoize(False)
+                cqutils.memoize(memoized)
+
+        shared = twice(True)
+        before = timeit(partial(twice, False), repeat=3)
+        after = timeit(partial(twice, True), repeat=3)
+        rows.append([name, ms(before), ms(after), f"{before / after:.1f}x", shared])
+    table(["built twice", "rebuilt", "memoized", "speedup", "shared"], rows)
+
+
+def bench_transforms():
+    """rotate_axis/align chains copying geometry vs moving by a location"""
+    import cqutils
+    from cqutils import W
+    import magnet
+
+    target = W().box(100, 3, 100)
+    parts = {
+        "box": W().box(18, 6.4, 8),
+        "magnet slot": magnet.magnet_2_10_20(hole_depth=0.4),
+        "filleted plate": W().box(60, 4, 70).edges("|Y").fillet(5).faces(">Y").hole(20),
+    }
+
+    def copying(obj):
+        # What rotate_axis() and align() used to do: copy the shape at every
+        # step, and measure it again for every face.
+        obj = obj.rotate((0, 0, 0), (0, 1, 0), 90).rotate((0, 0, 0), (0, 0, 1), 45)
+        for axis in "XYZ":
+            box1, box2 = obj.val().BoundingBox(), target.val().BoundingBox()
+            name = f"{axis.lower()}min"
+            step = getattr(box2, name) - getattr(box1, name)
+            obj = obj.translate(tuple(step * (a == axis) for a in "XYZ"))
+        return obj.translate((0, 0, 1)).val()
+
+    def moving(obj):
+        obj = obj.rotate_axis("Y", 90).rotate_axis("Z", 45)
+        return obj.align(target, "<X <Y <Z", dz=1).val()
+
+    rows = []
+    memoized = cqutils.memoize(False)  # Would skip the copies after the first run.
+    for name, obj in parts.items():
+        before, after = timeit(lambda: copying(obj)), timeit(lambda: moving(obj))
+        rows.append([name, ms(before), ms(after), f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["chain", "copy", "locate", "speedup"], rows)
+
+
+def bench_bbox():
+    """measure() of moved copies, BoundingBox() per axis vs the box cache"""
+    import cqutils
+    from cqutils import W
+
+    plate = (
+        W()
+        .box(60, 4, 70)
+        .edges("|Y")
+        .fillet(5)
+        .faces(">Y")
+        .workplane()
+        .rarray(8, 8, 6, 6)
+        .hole(3)
+        .rotate_axis("Y", 30)
+    )
+    # As align() and solid_box() see them: the same shape at many offsets.
+    copies = [plate.align(dx=dx) for dx in range(20)]
+
+    def uncached():
+        # What measure("X Y Z") used to do: one BoundingBox() per axis.
+        for obj in copies:
+            box = obj.val().BoundingBox
+            box().xlen, box().ylen, box().zlen
+
+    def cached():
+        cqutils._bounding_boxes.clear()
+        for obj in copies:
+            obj.measure("X Y Z")
+
+    before, after = timeit(uncached, repeat=3), timeit(cached, repeat=3)
+    rows = [["plate with 36 holes", ms(before), ms(after), f"{before / after:.1f}x"]]
+    table(["shape", "BoundingBox()", "cached", "speedup"], rows)
+
+
+def bench_selectors():
+    """faces()/edges() selectors, cadquery's vs the cached selection tables"""
+    import cadquery as cq
+    import cqutils
+    from cqutils import W
+
+    select = cq.Workplane._selectObjects
+    shapes = {
+        "box": W().box(20, 10, 5),
+        "hex-cut plate": W().box(150, 100, 3).cut_hexagon(),
+    }
+    selectors = [">Z", "<Y", "|Z", "%CYLINDER", "|X and <Z and <Y", "not <Y or <Z"]
+
+    def run(obj):
+        for selector in selectors:
+            obj.faces(selector), obj.edges(selector)
+
+    def cold(obj):
+        cqutils._selection_tables.clear()
+        cqutils._parse_selector.cache_clear()
+        run(obj)
+
+    rows = []
+    for name, obj in shapes.items():
+        cq.Workplane._selectObjects = select.__wrapped__
+        try:
+            before = timeit(partial(run, obj), repeat=3)
+        finally:
+            cq.Workplane._selectObjects = select
+        first, again = timeit(partial(cold, obj), repeat=3), timeit(partial(run, obj))
+        faces = len(obj.faces().vals())
+        rows.append([f"{name} ({faces} faces)", ms(before), ms(first), ms(again)])
+        rows[-1].append(f"{before / again:.0f}x")
+    table(["shape", "cadquery", "first", "cached", "speedup"], rows)
+    print(f"({len(selectors)} selectors, on faces and on edges)")
+
+
+def bench_patterns():
+    """arrays of cutting tools, built one by one vs moved instances"""
+    import cqutils
+    from cqutils import W, linear_locations, polar_locations
+
+    plate = W().cylinder(4, 60)
+    slot = W().center(40, 0).slot2D(20, 3, angle=45).extrude(4)
+    bar = W().box(2, 30, 10)
+    magnet = W().box(10, 3, 20).translate((0, 0, 40))
+
+    def polar_built():
+        tools = W().polarArray(40, 0, 360, 24).slot2D(20, 3, angle=45).extrude(4)
+        return plate.cut(tools)
+
+    def polar_moved():
+        return plate.cut_all([slot.pattern(polar_locations(24))])
+
+    def linear_built():
+        return [bar.translate((i * 4, 0, 0)) for i in range(32)]
+
+    def linear_moved():
+        return bar.pattern(linear_locations(32, x=4, centered=False))
+
+    def polar_rotated():
+        return [magnet.rotate_axis("Y", a) for a in range(0, 360, 90)]
+
+    def polar_located():
+        return magnet.pattern(polar_locations(4, "Y"))
+
+    cases = {
+        "24 slots cut from a disc": (polar_built, polar_moved),
+        "32 bars, translate loop": (linear_built, linear_moved),
+        "4 magnets, rotate_axis": (polar_rotated, polar_located),
+    }
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, (before, after) in cases.items():
+        before, after = timeit(before, repeat=3), timeit(after, repeat=3)
+        rows.append([name, ms(before), ms(after), f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["pattern", "built", "instanced", "speedup"], rows)
+
+
+def bench_hexagon():
+    """cut_hexagon on square panels, sketch booleans vs the analytic lattice"""
+    import cadquery as cq
+    import cqutils
+    from cqutils import W
+
+    def sketch_hexagons(obj, hex_radius=6, wall_thickness=1.4, border=1.4):
+        # What cut_hexagon used to do: clip two oversized grids with sketches.
+        dx = (3**0.5) * hex_radius + wall_thickness
+        dy = 3.0 * hex_radius + (3**0.5) * wall_thickness
+        box = obj.val().BoundingBox()
+        nx, ny = int(box.xlen / dx) + 2, int(box.ylen / dy) + 2
+        grid = cq.Sketch().rarray(dx, dy, nx, ny).regularPolygon(hex_radius, 6)
+        limit = (box.xlen - border * 2, box.ylen - border * 2)
+        sketch_a = cq.Sketch().rect(*limit).face(grid, mode="i")
+        grid = grid.moved(cq.Location(cq.Vector(dx / 2, dy / 2, 0)))
+        sketch_b = cq.Sketch().rect(*limit).face(grid, mode="i")
+        return obj.faces(">Z").workplane().placeSketch(sketch_a, sketch_b).cutThruAll()
+
+    rows = []
+    memoized = cqutils.memoize(False)
+    for size in [50, 100, 200, 300]:
+        panel = W().box(size, size, 3)
+        after = timeit(panel.cut_hexagon, repeat=1)
+        whole, clipped = cqutils._hex_lattice(size, size, 6, 1.4, 1.4)
+        row = [f"{size}x{size}mm", f"{len(whole)}+{len(clipped)}", "-", ms(after), "-"]
+        # The sketch booleans did not finish in an hour at 300mm.
+        if size <= 200:
+            before = timeit(partial(sketch_hexagons, panel), repeat=1)
+            row[2], row[4] = ms(before), f"{before / after:.1f}x"
+        rows.append(row)
+    cqutils.memoize(memoized)
+    table(["panel", "whole+clipped", "sketch", "lattice", "speedup"], rows)
+
+
+def bench_lightweight():
+    """cut_lightweight on plates with 4 holes, one batched cut vs cell by cell"""
+    from functools import reduce
+    import cqutils
+    from cqutils import W
+
+    rows = []
+    memoized = cqutils.memoize(False)
+    for size, graded in [(100, False), (100, True), (200, False), (200, True)]:
+        plate = W().box(size, size, 3).faces(">Z").workplane()
+        plate = plate.rarray(size - 20, size - 20, 2, 2).hole(4)
+        kwargs = {"min_cell_size": 5} if graded else {}
+        result = plate.cut_lightweight(**kwargs)
+        cells = plate.cut(result).solids().vals()
+        after = timeit(partial(plate.cut_lightweight, **kwargs), repeat=1)
+        before = timeit(lambda: reduce(lambda a, b: a.cut(b), cells, plate), repeat=1)
+        saved = 1 - result.val().Volume() / plate.val().Volume()
+        name = f"{size}mm {'graded' if graded else 'uniform'}"
+        row = [name, len(cells), f"{saved:.0%}", ms(before), ms(after)]
+        rows.append(row + [f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["plate", "cells", "saved", "cell by cell", "batched", "speedup"], rows)
+
+
+def bench_surface():
+    """surface_grow / surface_holes, via sketches and union_all vs direct extrusion"""
+    import cadquery as cq
+    import cqutils
+    from cqutils import W
+
+    def sketch_holes(obj, face, len):
+        # What surface_holes used to do.
+        obj_face = obj.faces(face)
+        plane = cq.Workplane().newObject([obj_face.val()]).workplane().plane
+        sketches = []
+        for f in obj_face.vals():
+            for w in f.innerWires():
+                sketches.append(cq.Sketch(cq.Face.makeFromWires(w)).finalize())
+        return W(W(plane).placeSketch(*sketches).extrude(len).val())
+
+    def union_grow(obj, face, length):
+        # What surface_grow used to do.
+        sel = W(obj.val()).faces(face)
+        vec = sel.workplane().plane.zDir * length
+        objs = [W(cq.Solid.extrudeLinear(v, vec)) for v in sel.vals()]
+        return cqutils.union_all(objs)
+
+    magnet = W().box(10, 3, 20).edges("|Y").fillet(1).rotate_axis("Z", 30)
+    plate = W().box(60, 4, 70).faces("<Y").workplane().rarray(20, 20, 3, 3).hole(4)
+    cases = {
+        "surface_grow, 1 magnet": (
+            partial(union_grow, magnet, "<Y", 30),
+            partial(magnet.surface_grow, "<Y", 30),
+        ),
+        "surface_holes, 9 holes": (
+            partial(sketch_holes, plate, "<Y", 50),
+            partial(plate.surface_holes, "<Y", len=50),
+        ),
+    }
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, (before, after) in cases.items():
+        before, after = timeit(before, repeat=20), timeit(after, repeat=20)
+        rows.append([name, ms(before), ms(after), f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["call", "before", "direct", "speedup"], rows)
+
+
+def bench_shell():
+    """cut_inner_box, OCCT shell vs the prism path, and shell on non-prisms"""
+    import math
+    import cqutils
+    from cqutils import W
+
+    ngon = [
+        (20 * math.cos(a * math.pi / 32), 20 * math.sin(a * math.pi / 32))
+        for a in range(64)
+    ]
+    shapes = {
+        "reel_magnet_case box": W().box(15, 5, 47),
+        "box, rounded |Z edges": W().box(40, 30, 20).edges("|Z").fillet(5),
+        "64-gon prism": W().polyline(ngon).close().extrude(20),
+        "box, all edges rounded": W().box(40, 30, 20).edges().fillet(2),
+    }
+    rows = []
+    memoized = cqutils.memoize(False)
+    for name, obj in shapes.items():
+        solid = obj.val()
+        prism = cqutils._hollow_prism(solid, obj.faces(">Z").vals(), 1) is not None
+        before = timeit(lambda: W(solid).faces(">Z").shell(-1), repeat=10)
+        after = timeit(lambda: obj.cut_inner_box(">Z", 1), repeat=10)
+        path = "prism" if prism else "shell"
+        rows.append([name, path, ms(before), ms(after), f"{before / after:.1f}x"])
+    cqutils.memoize(memoized)
+    table(["solid", "path", "shell", "cut_inner_box", "speedup"], rows)
+
+
+def bench_primitives():
+    """booleans and edge selection vs primitives built from profiles"""
+    import cqutils
+    from cqutils import W, annular_sector, profile_box
+
+    def ring():
+        w = cqutils.Workplane()
+        box = w.center(60, 60).box(120, 120, 10)
+        return w.cylinder(10, 120).intersect(box).cut(w.cylinder(10, 100))
+
+    def magnet():
+        box = W().box(9.9, 60, 3.1)
+        box = box.edges("|X and <Z and <Y").chamfer(0.4, 0.6)
+        return box.edges("|X and <Z and >Y").chamfer(1.0, 0.6)
+
+    corners = {"<Y<Z": (0.6, 0.4), ">Y<Z": (1.0, 0.6)}
+    rounded = ["<X<Y", ">X<Y", ">X>Y", "<X>Y"]
+    cases = {
+        "quarter ring": (ring, lambda: annular_sector(100, 120, 10)),
+        "chamfered magnet": (magnet, lambda: profile_box(9.9, 60, 3.1, corners, "X")),
+        "rounded box": (
+            lambda: W().box(40, 30, 20).edges("|Z").fillet(5),
+            lambda: profile_box(40, 30, 20, dict.fromkeys(rounded, 5)),
+        ),
+    }
+    rows = []
+    for name, (before, after) in cases.items():
+        memoized = cqutils.memoize(False)
+        old, new = timeit(before, repeat=10), timeit(after, repeat=10)
+        cqutils.memoize(True)
+        after()
+        memo = timeit(after, repeat=10)
+        cqutils.memoize(False)
+        cqutils.memoize(memoized)
+        rows.append([name, ms(old), ms(new), ms(memo), f"{old / new:.1f}x"])
+    table(["shape", "before", "profile", "memo", "speedup"], rows)
+
+
+def bench_parallel():
+    """cold build of the heaviest scripts, serial vs parallel OCCT"""
+    import subprocess
+
+    scripts = ["drain_hair_catcher.py", "epd_frame.py", "kw1_polish.py"]
+    modes = {"serial": {"CQ_PARALLEL": "0"}, "parallel": {"CQ_PARALLEL": "1"}}
+    rows = []
+    for script in scripts:
+        row = [script]
+        for env in modes.values():
+            env = dict(
+                os.environ,
+                CQ_CACHE_DIR=tempfile.mkdtemp(prefix="cq-cache-bench-"),
+                STL_OUT=tempfile.mkdtemp(prefix="stl-bench-"),
+                **env,
+            )
+            run = partial(subprocess.run, [sys.executable, script], env=env, check=True)
+            row.append(ms(timeit(partial(run, cwd=src_dir), repeat=1)))
+        rows.append(row)
+    table(["script", *modes], rows)
+    print(f"(cpus: {os.cpu_count()})")
+
+
+def main():
+    names = sys.argv[1:] or [n[6:] for n in globals() if n.startswith("bench_")]
+    for name in names:
+        func = globals()[f"bench_{name}"]
+        print(f"## {name}: {func.__doc__}")
+        func()
+        print()
+
+
+if __name__ == "__main__":
+    main()
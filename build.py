@@ -97,19 +97,24 @@ def generate_preview_svg(src_path, img_path):
     real_export = exporters.export
     old_pwd = os.getcwd()
     old_sys_path = sys.path
+    src_full_path = os.path.realpath(src_path)
+    sys.path[0:0] = [os.path.dirname(src_full_path)]
+    import cqutils
 
-    # Replace export to figure out what to export.
+    real_write_stl = cqutils._write_stl
+
+    # Replace export to figure out what to export. cqutils.export() writes
+    # STL through cqutils._write_stl.
     objects = []
 
     def capture_object(obj, *args, **kwargs):
         objects.append(obj)
 
     exporters.export = capture_object
+    cqutils._write_stl = capture_object
 
     try:
         mod = type(os)("__preview__")
-        src_full_path = os.path.realpath(src_path)
-        sys.path[0:0] = [os.path.dirname(src_full_path)]
         mod.__file__ = src_full_path
         mod.show_object = capture_object
         code = compile(try_read(src_full_path), src_path, "exec")
@@ -117,8 +122,10 @@ def generate_preview_svg(src_path, img_path):
         eval(code, mod.__dict__, mod.__dict__)
     finally:
         exporters.export = real_export
+        cqutils._write_stl = real_write_stl
         os.chdir(old_pwd)
         sys.path = old_sys_path
+        collect_cache_stats()
 
     if not objects:
         return None
@@ -144,6 +151,26 @@ def generate_preview_svg(src_path, img_path):
     return size_str
 
 
+# cq_cache counters of the scripts run by generate_preview_svg, by function.
+cache_summary = {}
+
+
+def collect_cache_stats():
+    cqutils = sys.modules.get("cqutils")
+    if cqutils is None:
+        return
+    for name, counters in cqutils.cache_stats(reset=True).items():
+        total = cache_summary.setdefault(name, dict.fromkeys(counters, 0))
+        for field, value in counters.items():
+            total[field] += value
+
+
+def print_cache_summary():
+    if cache_summary:
+        print("cq_cache summary:")
+        print(sys.modules["cqutils"].cache_stats_table(cache_summary))
+
+
 def crop_svg(svg_path):
     subprocess.call(
         [
@@ -229,6 +256,7 @@ def main():
             f.write(new_readme)
     else:
         print("README is up-to-date")
+    print_cache_summary()
 
 
 if __name__ == "__main__":
@@ -1,126 +1,2027 @@
+import ast
+import atexit
+import hashlib
 import inspect
+import io
+import json
+import marshal
 import math
+import mmap
 import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import types
 import typing
-from functools import reduce, wraps
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import cached_property, lru_cache, partial, reduce, wraps
 
 import cadquery as cq
 
 Workplane = cq.Workplane
 
 
+_workplane_methods = {}
+
+
 def workplane_method(func):
     """Define method on Workplane object"""
     # for compat, but not for typecheck
     setattr(cq.Workplane, func.__name__, func)
+    _workplane_methods[func.__name__] = func
     return func
 
 
-def union_all(objs):
-    """Union all non-empty objects in order.
+def union_all(objs, exact=False, glue=None, fuzzy=None, clean=True):
+    """Union all non-empty objects in one boolean operation.
+
+    Objects that do not touch any other are not fused, only put in the
+    resulting compound. Objects that only share faces (ex. boxes stacked
+    side by side) are fused with OCCT's faster glue option.
 
     Args:
         objs: Iterable of solids/workplanes; falsy items are ignored.
+        exact: Also measure the distance between objects whose bounding boxes
+            overlap, instead of fusing them.
+        glue: Whether to use the glue option. None: use it if no bounding
+            boxes overlap by more than a face.
+        fuzzy: Fuzzy value, treating parts closer than this as touching.
+        clean: Whether to clean the fused result, like Workplane.union.
     """
+    objs = list(filter(None, objs))
     if not objs:
         return W()
-    return reduce(lambda a, b: a.union(b), filter(None, objs))
+    if any(isinstance(obj, Lazy) for obj in objs):
+        return lazy(objs[0]).union(*objs[1:])
+    first = objs[0]
+    if isinstance(first, cq.Shape):
+        first = cq.Workplane(obj=first)
+    if len(objs) == 1:
+        return first
+    # Same operands as first.union(obj) for each obj.
+    shapes = []
+    base = first._findType((cq.Solid,), searchStack=True, searchParents=True)
+    if base is not None:
+        shapes.append(base)
+    for obj in objs[1:]:
+        if isinstance(obj, cq.Workplane):
+            solids = obj.solids().vals()
+            if not solids:
+                raise ValueError(f"union_all: {obj} has no solid")
+            shapes += solids
+            first._mergeTags(obj)
+        else:
+            shapes.append(obj)
+    groups = _touching_groups(shapes, exact)
+
+    def fuse(group):
+        group_glue = _only_touching(group) if glue is None else glue
+        result = _fuse_all(group, glue=group_glue, tol=fuzzy)
+        return result.clean() if clean else result
+
+    if len(groups) == 1:
+        return first.newObject([fuse(shapes)])
+    parts = []
+    for group in groups:
+        shape = group[0] if len(group) == 1 else fuse(group)
+        parts += list(shape) if isinstance(shape, cq.Compound) else [shape]
+    return first.newObject([cq.Compound.makeCompound(parts)])
+
+
+@workplane_method
+def cut_all(obj, tools, exact=False, clean=True):
+    """Cut all non-empty tools from obj in one boolean operation.
+
+    Like cut(), tools outside the bounding box of obj are dropped.
+
+    Args:
+        obj: Workplane to cut from.
+        tools: Iterable of solids/workplanes; falsy items are ignored.
+        exact: Also drop tools that are inside the bounding box of obj but do
+            not touch it.
+        clean: Whether to clean the result, like Workplane.cut.
+    """
+    from OCP.Standard import Standard_Failure
+
+    # Same operands as obj.cut(tool) for each tool.
+    shapes = []
+    for tool in filter(None, tools):
+        if isinstance(tool, Lazy):
+            tool = tool.evaluate()
+        if isinstance(tool, cq.Workplane):
+            shapes += [v for v in tool.vals() if isinstance(v, cq.Shape)]
+            obj._mergeTags(tool)
+        else:
+            shapes.append(tool)
+    if not shapes:
+        return obj
+    base = obj.findSolid()
+    if exact:
+        box = _bnd_box(base)
+        shapes = [t for t in shapes if not _disjoint(base, t, box, _bnd_box(t))]
+    try:
+        result = base.cut(*shapes)
+    except (ValueError, Standard_Failure):
+        result = base.cut(_fuse_all(shapes))
+    return obj.newObject([result.clean() if clean else result])
+
+
+def _bnd_box(shape):
+    """Bounding box of shape, enlarged by its tolerance.
+
+    Unlike shape.BoundingBox(), this ignores triangulations, which can make
+    the box of curved faces smaller than the faces.
+    """
+    from OCP.Bnd import Bnd_Box
+    from OCP.BRepBndLib import BRepBndLib
+
+    box = Bnd_Box()
+    BRepBndLib.Add_s(shape.wrapped, box, False)
+    return box
+
+
+_bounding_boxes = OrderedDict()  # _ShapeKey -> Bnd_Box, least recently used first
+_BOUNDING_BOXES_SIZE = 4096
+
+
+def _bounding_box(shape):
+    """Exact bounding box of shape, as a new cq.BoundBox. Memoized per shape.
+
+    Like shape.BoundingBox(), but ignores triangulations, so the box does not
+    depend on whether the shape was exported (or loaded by cq_cache) before.
+    Boxes are remembered without the translation of the shape: moving a
+    shape only shifts its box.
+    """
+    from OCP.Bnd import Bnd_Box
+    from OCP.BRepBndLib import BRepBndLib
+    from OCP.gp import gp_Trsf, gp_Vec
+    from OCP.TopLoc import TopLoc_Location
+
+    trsf = shape.wrapped.Location().Transformation()
+    offset = gp_Trsf()
+    offset.SetTranslation(gp_Vec(trsf.TranslationPart()))
+    trsf.SetTranslationPart(gp_Vec())
+    unmoved = shape.wrapped.Located(TopLoc_Location(trsf))
+    key = _ShapeKey(unmoved)
+    box = _bounding_boxes.get(key)
+    if box is None:
+        box = Bnd_Box()
+        BRepBndLib.AddOptimal_s(unmoved, box, False, False)
+        _bounding_boxes[key] = box
+        if len(_bounding_boxes) > _BOUNDING_BOXES_SIZE:
+            _bounding_boxes.popitem(last=False)
+    else:
+        _bounding_boxes.move_to_end(key)
+    return cq.BoundBox(box.Transformed(offset))
+
+
+def _disjoint(shape1, shape2, box1, box2, exact=True):
+    """Whether shape1 and shape2 neither touch nor contain each other."""
+    from OCP.BRepExtrema import BRepExtrema_DistShapeShape
+    from OCP.Precision import Precision
+
+    if box1.IsOut(box2):
+        return True
+    if not exact:
+        return False
+    dist = BRepExtrema_DistShapeShape(shape1.wrapped, shape2.wrapped)
+    return dist.IsDone() and dist.Value() > Precision.Confusion_s()
+
+
+def _touching_groups(shapes, exact=False):
+    """Split shapes into groups that do not touch each other."""
+    boxes = [_bnd_box(s) for s in shapes]
+    group_of = list(range(len(shapes)))
+
+    def find(i):
+        while group_of[i] != i:
+            i = group_of[i] = group_of[group_of[i]]
+        return i
+
+    for i in range(len(shapes)):
+        for j in range(i):
+            if find(i) != find(j) and not _disjoint(
+                shapes[i], shapes[j], boxes[i], boxes[j], exact
+            ):
+                group_of[find(i)] = find(j)
+    groups = {}
+    for i, shape in enumerate(shapes):
+        groups.setdefault(find(i), []).append(shape)
+    return list(groups.values())
+
+
+def _only_touching(shapes):
+    """Whether no two bounding boxes of shapes overlap by more than a face.
+
+    Such shapes can share faces, edges or vertices, but no volume.
+    """
+    from OCP.Precision import Precision
+
+    boxes = [_bnd_box(s) for s in shapes]
+    for i, box1 in enumerate(boxes):
+        min1, max1 = box1.CornerMin(), box1.CornerMax()
+        for box2 in boxes[:i]:
+            if box1.IsOut(box2):
+                continue
+            min2, max2 = box2.CornerMin(), box2.CornerMax()
+            flat = box1.GetGap() + box2.GetGap() + Precision.Confusion_s()
+            if all(
+                min(getattr(max1, a)(), getattr(max2, a)())
+                - max(getattr(min1, a)(), getattr(min2, a)())
+                > flat
+                for a in ("X", "Y", "Z")
+            ):
+                return False
+    return True
+
+
+def _fuse_all(shapes, **kwargs):
+    """Fuse shapes with one OCCT operation.
+
+    If that fails, fuse pairs of shapes in a balanced tree instead.
+
+    Args:
+        kwargs: Options of cq.Shape.fuse (glue, tol).
+    """
+    from OCP.Standard import Standard_Failure
+
+    first, *rest = shapes
+    try:
+        return first.fuse(*rest, **kwargs)
+    except (ValueError, Standard_Failure):
+        pass
+    while len(shapes) > 1:
+        pairs = [shapes[i : i + 2] for i in range(0, len(shapes), 2)]
+        shapes = [
+            pair[0].fuse(pair[1], **kwargs) if len(pair) == 2 else pair[0]
+            for pair in pairs
+        ]
+    return shapes[0]
+
+
+def _env_size(name, default):
+    """Read a byte size like "512M" or "2G" from an environment variable."""
+    value = (os.getenv(name) or "").strip().upper()
+    if not value:
+        return default
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _write_bin(s, f, triangles=False):
+    """Write TopoDS_Shape s to stream f in OCCT's binary format."""
+    from OCP.BinTools import BinTools, BinTools_FormatVersion
+
+    version = BinTools_FormatVersion.BinTools_FormatVersion_CURRENT
+    BinTools.Write_s(s, f, triangles, False, version)
+
+
+def _read_bin(f):
+    """Read a TopoDS_Shape written by `_write_bin` from stream f."""
+    from OCP.BinTools import BinTools
+    from OCP.TopoDS import TopoDS_Shape
+
+    s = TopoDS_Shape()
+    BinTools.Read_s(s, f)
+    return s
+
+
+class _ViewReader(io.RawIOBase):
+    """Readable stream over a memoryview, without copying it to bytes."""
+
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self.view) - self.pos)
+        b[:n] = self.view[self.pos : self.pos + n]
+        self.pos += n
+        return n
+
+
+def _lock_file(path, blocking=True):
+    """Open path and lock it exclusively, across processes.
+
+    Return the open file, which holds the lock until closed. If blocking is
+    False and the lock is held elsewhere, return None instead of waiting.
+    """
+    while True:
+        f = open(path, "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.05)
+            else:
+                import fcntl
+
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError:
+            f.close()
+            if blocking:
+                raise
+            return None
+        # The lock file might have been removed (by gc) while we waited.
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+class _FileLock:
+    """Exclusive cross-process lock on a file. Reentrant within a process."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.depth = 0
+
+    def __enter__(self):
+        if self.depth == 0:
+            self.file = _lock_file(self.path)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            self.file.close()
+            self.file = None
+
+
+class _CacheStore:
+    """Two-tier store for cq_cache.
+
+    The front tier keeps already-parsed shapes in memory, as a LRU bounded by
+    the serialized size of its entries. The back tier is a single append-only
+    pack file plus a SQLite index (key -> meta, offset, size, access time).
+    Shapes are stored in OCCT's binary format, and read from a memory map of
+    the pack file. `gc` drops entries that are too old or exceed the size
+    budget, then rewrites the live entries into a new pack file.
+
+    Several processes can share a store. Writers append to the pack file under
+    an exclusive lock, and only then add the entry to the index, so readers
+    never see partially written entries. `lock(key)` lets cq_cache compute
+    each key once across processes.
+    """
+
+    # Part of cache keys. Change it when the pack file format changes.
+    FORMAT = "bin2"
+
+    def __init__(self, path, max_size=1 << 30, max_age=30 * 86400, mem_size=256 << 20):
+        self.path = path
+        self.max_size = max_size
+        self.max_age = max_age
+        self.mem_size = mem_size
+        self.mem = OrderedDict()  # key -> (meta, shape, size)
+        self.mem_bytes = 0
+        self.map = None  # (path, mmap) of the pack file
+        self.locks = {}  # key -> _FileLock
+        os.makedirs(os.path.join(path, "locks"), exist_ok=True)
+        self.write_lock = _FileLock(os.path.join(path, "lock"))
+        self.db = sqlite3.connect(os.path.join(path, "index.sqlite"), timeout=60)
+        # WAL: readers do not block the writer, and the other way around.
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                meta BLOB NOT NULL,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            INSERT OR IGNORE INTO settings VALUES ('pack', 'pack-0');
+            """)
+        self.db.commit()
+
+    def _pack_path(self):
+        (name,) = self.db.execute(
+            "SELECT value FROM settings WHERE name = 'pack'"
+        ).fetchone()
+        return os.path.join(self.path, name)
+
+    def _read_at(self, name, offset, size):
+        """Memory view of an entry in pack file name, or None if it is missing.
+
+        Release the view before the map is closed, ex. `with view:`.
+        """
+        path = os.path.join(self.path, name)
+        if self.map is None or self.map[0] != path or len(self.map[1]) < offset + size:
+            self._unmap()
+            try:
+                with open(path, "rb") as f:
+                    self.map = (path, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except (FileNotFoundError, ValueError):  # ValueError: empty file
+                return None
+        mm = self.map[1]
+        if len(mm) < offset + size:
+            return None
+        return memoryview(mm)[offset : offset + size]
+
+    def _unmap(self):
+        if self.map is not None:
+            self.map[1].close()
+            self.map = None
+
+    def _remember(self, key, meta, shape, size):
+        old = self.mem.pop(key, None)
+        if old is not None:
+            self.mem_bytes -= old[2]
+        if size > self.mem_size:
+            return
+        self.mem[key] = (meta, shape, size)
+        self.mem_bytes += size
+        while self.mem_bytes > self.mem_size:
+            _key, (_meta, _shape, old_size) = self.mem.popitem(last=False)
+            self.mem_bytes -= old_size
+
+    def get(self, key):
+        """Return (meta, TopoDS_Shape, bytes read from disk) for key.
+
+        Return None on a miss. Hits from the in-memory tier read 0 bytes.
+        """
+        hit = self.mem.get(key)
+        if hit is not None:
+            self.mem.move_to_end(key)
+            return hit[0], hit[1], 0
+        # Read the pack name with the entry, in case gc in another process
+        # switches to a new pack file in between.
+        row = self.db.execute(
+            "SELECT meta, offset, size, accessed,"
+            " (SELECT value FROM settings WHERE name = 'pack')"
+            " FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        meta, offset, size, accessed, pack = row
+        view = self._read_at(pack, offset, size)
+        if view is None:
+            # The pack file was removed or truncated behind our back. Unless
+            # gc just replaced it, the entry is lost.
+            with self.write_lock:
+                self.db.execute(
+                    "DELETE FROM entries WHERE key = ? AND"
+                    " (SELECT value FROM settings WHERE name = 'pack') = ?",
+                    (key, pack),
+                )
+                self.db.commit()
+            return None
+        # BinTools reads the entry through a view of the map, without copying
+        # it to bytes. Reading the mmap object itself instead takes ~30ms per
+        # entry on a large pack, whatever the entry size.
+        with view:
+            shape = _read_bin(_ViewReader(view))
+        now = time.time()
+        # Access times only matter for eviction. Avoid a write per hit.
+        if now - accessed > 3600:
+            self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.db.commit()
+        meta = marshal.loads(meta)
+        self._remember(key, meta, shape, size)
+        return meta, shape, size
+
+    def put(self, key, meta, shape):
+        """Store TopoDS_Shape with a marshal-able meta dict under key.
+
+        The triangulation of the shape, if any, is stored with it.
+        Return (bytes written, the shape read back from them). The shape
+        read back can differ from the given one in the last bits of some
+        coordinates, and is what later get() calls return.
+        """
+        buf = io.BytesIO()
+        _write_bin(shape, buf, triangles=True)
+        data = buf.getvalue()
+        with self.write_lock:
+            with open(self._pack_path(), "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # Only index the entry once it is completely on disk. A crash
+            # before this point leaves unreferenced bytes that gc drops.
+            now = time.time()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, marshal.dumps(meta), offset, len(data), now, now),
+            )
+            self.db.commit()
+            if offset + len(data) > self.max_size * 2:
+                self.gc()
+        stored = _read_bin(io.BytesIO(data))
+        self._remember(key, meta, stored, len(data))
+        return len(data), stored
+
+    def lock(self, key):
+        """Cross-process lock for computing the entry of key."""
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = _FileLock(os.path.join(self.path, "locks", key))
+        return lock
+
+    def clear_memory(self):
+        """Drop the in-memory tier."""
+        self.mem.clear()
+        self.mem_bytes = 0
+
+    def stats(self):
+        """Return a dict describing the store."""
+        count, live_bytes, oldest, newest = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(accessed), MAX(accessed)"
+            " FROM entries"
+        ).fetchone()
+        pack_path = self._pack_path()
+        return {
+            "path": self.path,
+            "entries": count,
+            "live_bytes": live_bytes,
+            "pack_bytes": (
+                os.path.getsize(pack_path) if os.path.exists(pack_path) else 0
+            ),
+            "oldest_access": oldest and time.ctime(oldest),
+            "newest_access": newest and time.ctime(newest),
+            "memory_entries": len(self.mem),
+            "memory_bytes": self.mem_bytes,
+        }
+
+    def gc(self):
+        """Evict old and least recently used entries, then compact the pack file.
+
+        Return the number of evicted entries.
+        """
+        with self.write_lock:
+            return self._gc()
+
+    def _gc(self):
+        db = self.db
+        evicted = db.execute(
+            "DELETE FROM entries WHERE accessed < ?", (time.time() - self.max_age,)
+        ).rowcount
+        total = 0
+        rows = db.execute("SELECT key, size FROM entries ORDER BY accessed DESC")
+        for key, size in rows.fetchall():
+            total += size
+            if total > self.max_size:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                evicted += 1
+
+        # Copy live entries to a new pack file. The index switches to it in
+        # the same transaction that updates the offsets.
+        old_path = self._pack_path()
+        new_name = f"pack-{time.time_ns()}"
+        new_path = os.path.join(self.path, new_name)
+        rows = db.execute("SELECT key, offset, size FROM entries ORDER BY offset")
+        with open(old_path, "ab+") as src, open(new_path + ".tmp", "wb") as dst:
+            for key, offset, size in rows.fetchall():
+                src.seek(offset)
+                new_offset = dst.tell()
+                dst.write(src.read(size))
+                db.execute(
+                    "UPDATE entries SET offset = ? WHERE key = ?", (new_offset, key)
+                )
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(new_path + ".tmp", new_path)
+        db.execute("UPDATE settings SET value = ? WHERE name = 'pack'", (new_name,))
+        db.commit()
+        self._unmap()
+        os.unlink(old_path)
+
+        for name in os.listdir(self.path):
+            # Loose files written by older versions of cq_cache, and packs
+            # left behind by an interrupted gc.
+            if (len(name) == 64 and all(c in "0123456789abcdef" for c in name)) or (
+                name.startswith("pack-") and name != new_name
+            ):
+                os.unlink(os.path.join(self.path, name))
+
+        # Remove lock files that nobody holds.
+        locks_dir = os.path.join(self.path, "locks")
+        for name in os.listdir(locks_dir):
+            if name in self.locks and self.locks[name].depth:
+                continue
+            f = _lock_file(os.path.join(locks_dir, name), blocking=False)
+            if f is not None:
+                with f:
+                    try:
+                        os.unlink(f.name)
+                    except OSError:  # Windows cannot remove open files
+                        pass
+
+        for key in list(self.mem):
+            if not db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+                self.mem_bytes -= self.mem.pop(key)[2]
+        return evicted
+
+
+_cache_store = None
+
+
+def cache_store():
+    """Return the process-wide cq_cache store.
+
+    Configured by environment variables:
+        CQ_CACHE_DIR: Store location. Default: $TMPDIR/cq-cache.
+        CQ_CACHE_MAX_SIZE: On-disk budget, like "2G". Default: 1G.
+        CQ_CACHE_MAX_AGE: Evict entries not used for this many days. Default: 30.
+        CQ_CACHE_MEM_SIZE: In-memory budget, like "512M". Default: 256M.
+    """
+    global _cache_store
+    if _cache_store is None:
+        path = os.getenv("CQ_CACHE_DIR") or os.path.join(
+            tempfile.gettempdir(), "cq-cache"
+        )
+        _cache_store = _CacheStore(
+            path,
+            max_size=_env_size("CQ_CACHE_MAX_SIZE", 1 << 30),
+            max_age=float(os.getenv("CQ_CACHE_MAX_AGE") or 30) * 86400,
+            mem_size=_env_size("CQ_CACHE_MEM_SIZE", 256 << 20),
+        )
+    return _cache_store
+
+
+_fingerprints = weakref.WeakKeyDictionary()
+
+
+def _shape_fingerprint(shape):
+    """Hash of the geometry of a cq.Shape. Memoized per shape.
+
+    Results of cached booleans are fingerprinted by their cache key instead.
+    See `cache_booleans`.
+    """
+    orientation = shape.wrapped.Orientation()
+    hit = _fingerprints.get(shape)
+    if hit is not None and hit[0] == orientation:
+        return hit[1]
+    buf = io.BytesIO()
+    _write_bin(shape.wrapped, buf)
+    fingerprint = hashlib.blake2s(buf.getvalue()).hexdigest()
+    _fingerprints[shape] = (orientation, fingerprint)
+    return fingerprint
+
+
+def _is_user_function(f):
+    """Whether f is part of these scripts, not a library, so its source matters."""
+    module = (getattr(f, "__module__", None) or "").split(".")[0]
+    if module in sys.stdlib_module_names or module in {"cadquery", "OCP"}:
+        return False
+    path = f.__code__.co_filename
+    return "site-packages" not in path and "dist-packages" not in path
+
+
+def _function_source(f):
+    try:
+        return inspect.getsource(f)
+    except (OSError, TypeError):
+        # Scripts executed by build.py or import_part are compiled with
+        # relative file names. Read the source from __file__ instead.
+        path = f.__globals__.get("__file__")
+        if not path:
+            raise
+        with open(path) as src:
+            lines = src.readlines()
+        return "".join(inspect.getblock(lines[f.__code__.co_firstlineno - 1 :]))
+
+
+def _normalized_code(code):
+    """Code object without file names and line numbers. Python version specific."""
+    consts = tuple(
+        _normalized_code(c) if isinstance(c, types.CodeType) else c
+        for c in code.co_consts
+    )
+    return (code.co_code, consts, code.co_names, code.co_varnames, code.co_freevars)
+
+
+_code_digests = {}
+
+
+def _code_digest(f):
+    """(digest, referenced names) of a function's code.
+
+    The digest is based on the source without decorators, docstrings, comments
+    and positions, so the same function in different directories or checkouts
+    has the same digest. Without source, fall back to the bytecode. Either way
+    the digest depends on the Python minor version.
+    """
+    code = f.__code__
+    hit = _code_digests.get(code)
+    if hit is not None:
+        return hit
+    try:
+        tree = ast.parse(textwrap.dedent(_function_source(f)))
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                node.decorator_list = []
+                body = node.body
+                if body and isinstance(body[0], ast.Expr):
+                    if isinstance(body[0].value, ast.Constant) and len(body) > 1:
+                        del body[0]
+        # ast.dump output differs between Python versions.
+        normalized = marshal.dumps((sys.version_info[:2], ast.dump(tree)))
+    except (OSError, TypeError, SyntaxError):
+        normalized = marshal.dumps((sys.version_info[:2], _normalized_code(code)))
+
+    def names(code):
+        result = set(code.co_names)
+        for c in code.co_consts:
+            if isinstance(c, types.CodeType):
+                result |= names(c)
+        return result
+
+    hit = (hashlib.blake2s(normalized).hexdigest(), frozenset(names(code)))
+    _code_digests[code] = hit
+    return hit
+
+
+def _describe(value, seen, strict=False):
+    """Marshal-able description of a value that affects a cached result.
+
+    Functions are described by their code, plus (transitively) the globals,
+    closure variables and Workplane methods they refer to. Shapes are described
+    by their geometry. Other objects are described by repr() if that looks
+    stable, otherwise only by type, or TypeError if strict.
+    """
+    match value:
+        case None | bool() | int() | float() | complex() | str() | bytes():
+            return value
+        case tuple() | list():
+            return (
+                type(value).__name__,
+                tuple(_describe(v, seen, strict) for v in value),
+            )
+        case dict():
+            items = [(repr(k), _describe(v, seen, strict)) for k, v in value.items()]
+            return ("dict", tuple(sorted(items)))
+        case set() | frozenset():
+            items = [marshal.dumps(_describe(v, seen, strict)) for v in value]
+            return ("set", tuple(sorted(items)))
+        case cq.Workplane():
+            plane = _describe(value.plane, seen)
+            return ("Workplane", plane, _describe(value.objects, seen, strict))
+        case cq.Shape():
+            return ("Shape", _shape_fingerprint(value))
+        case cq.Vector():
+            return ("Vector", value.toTuple())
+        case cq.Location():
+            return ("Location", value.toTuple())
+        case cq.Plane():
+            dirs = (value.origin, value.xDir, value.zDir)
+            return ("Plane", tuple(v.toTuple() for v in dirs))
+        case Lazy():
+            # The expression, so a cache hit does not evaluate it.
+            args = value.args if value.op != "move" else value.args[0].toTuple()
+            children = [_describe(c, seen, strict) for c in value.children]
+            return ("Lazy", value.op, _describe(args, seen, strict), tuple(children))
+        case partial():
+            func = _describe(value.func, seen)
+            args = _describe(value.args, seen, strict)
+            return ("partial", func, args, _describe(value.keywords, seen, strict))
+        case types.FunctionType():
+            return _describe_function(value, seen)
+        case types.MethodType():
+            return ("method", _describe(value.__func__, seen))
+        case types.ModuleType():
+            return ("module", value.__name__)
+        case type():
+            return ("type", value.__module__, value.__qualname__)
+    from OCP.TopoDS import TopoDS_Shape
+
+    if isinstance(value, TopoDS_Shape):
+        return _describe(cq.Shape.cast(value), seen)
+    text = repr(value)
+    if " at 0x" not in text:
+        return ("repr", type(value).__qualname__, text)
+    if strict:
+        raise TypeError(f"cq_cache cannot hash {type(value)} objects")
+    return ("object", type(value).__module__, type(value).__qualname__)
+
+
+def _describe_function(f, seen):
+    f = getattr(f, "__wrapped__", f)  # functions decorated by @cq_cache
+    if not _is_user_function(f):
+        return ("library", f.__module__, f.__qualname__)
+    name = f.__qualname__
+    if id(f) in seen:
+        return ("recursive", name)
+    seen[id(f)] = f
+    digest, names = _code_digest(f)
+    refs = []
+    for ref in sorted(names):
+        if ref in f.__globals__:
+            v = f.__globals__[ref]
+            if isinstance(v, types.ModuleType):
+                # Attributes accessed on the module, like magnet.magnet2510.
+                attrs = [n for n in sorted(names) if n in vars(v)]
+                v = [getattr(v, n) for n in attrs if _is_script_object(getattr(v, n))]
+            refs.append((ref, _describe(v, seen)))
+        elif ref in _workplane_methods:
+            refs.append((ref, _describe(_workplane_methods[ref], seen)))
+    cells = []
+    for ref, cell in zip(f.__code__.co_freevars, f.__closure__ or ()):
+        try:
+            cells.append((ref, _describe(cell.cell_contents, seen)))
+        except ValueError:  # empty cell
+            cells.append((ref, None))
+    defaults = _describe((f.__defaults__, f.__kwdefaults__), seen)
+    return ("function", name, digest, defaults, tuple(refs), tuple(cells))
+
+
+def _is_script_object(value):
+    match value:
+        case types.FunctionType():
+            return _is_user_function(getattr(value, "__wrapped__", value))
+        case partial():
+            return _is_script_object(value.func)
+        case cq.Workplane() | cq.Shape() | Lazy():
+            return True
+    return False
+
+
+def _versions():
+    import OCP
+
+    return (cq.__version__, getattr(OCP, "__version__", ""))
+
+
+def _cache_key(function, args, kwargs):
+    """Key for a cq_cache call.
+
+    Covers the function and everything it depends on (see `_describe`), the
+    arguments, the cadquery/OCP versions and the Python minor version. The
+    key does not depend on the location of the scripts.
+    """
+    seen = {}
+    desc = (
+        _versions(),
+        _CacheStore.FORMAT,
+        _describe(function, seen),
+        _describe(args, seen, strict=True),
+        _describe(kwargs, seen, strict=True),
+    )
+    if _defer_clean:
+        desc += ("deferred clean",)
+    return hashlib.blake2s(marshal.dumps(desc)).hexdigest()
+
+
+_cache_stats = {}  # function name -> counters, see cache_stats()
+
+_CACHE_STAT_FIELDS = (
+    "calls",
+    "hits",
+    "memory_hits",
+    "misses",
+    "bytes_read",
+    "bytes_written",
+    "key_time",
+    "load_time",
+    "build_time",
+    "write_time",
+    "saved_time",
+)
+
+
+def _count_cache_stats(name, **values):
+    stats = _cache_stats.get(name)
+    if stats is None:
+        stats = _cache_stats[name] = dict.fromkeys(_CACHE_STAT_FIELDS, 0)
+    for field, value in values.items():
+        stats[field] += value
+
+
+def cache_stats(reset=False):
+    """Return cq_cache counters of this process, by function name.
+
+    Counters:
+        calls, hits, memory_hits, misses: Number of calls. memory_hits is the
+            part of hits served from the in-memory tier.
+        bytes_read, bytes_written: Bytes read from or written to the pack file.
+        key_time: Seconds spent computing cache keys.
+        load_time: Seconds spent looking up entries and loading hits.
+        build_time: Seconds spent running the function on misses.
+        write_time: Seconds spent storing results of misses.
+        saved_time: Build time avoided by hits (as recorded when the entries
+            were built), minus all of the above overhead.
+
+    Args:
+        reset: Clear the counters after reading them.
+    """
+    stats = {name: dict(counters) for name, counters in _cache_stats.items()}
+    if reset:
+        _cache_stats.clear()
+    return stats
+
+
+def cache_stats_table(stats):
+    """Format the result of `cache_stats` as a text table."""
+    header = ["function", "calls", "hits", "mem", "misses", "read", "written"]
+    header += ["key", "load", "build", "write", "saved"]
+    total = dict.fromkeys(_CACHE_STAT_FIELDS, 0)
+    for counters in stats.values():
+        for field, value in counters.items():
+            total[field] += value
+    items = sorted(stats.items(), key=lambda item: -item[1]["saved_time"])
+    rows = [header]
+    for name, counters in items + [("total", total)]:
+        row = [name] + [str(counters[f]) for f in _CACHE_STAT_FIELDS[:4]]
+        row += [f"{counters[f] / 1024:.0f}K" for f in ("bytes_read", "bytes_written")]
+        row += [f"{counters[f]:.2f}s" for f in _CACHE_STAT_FIELDS[6:]]
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
+
+
+def _dump_cache_stats():
+    stats = cache_stats()
+    if not stats:
+        return
+    match os.getenv("CQ_CACHE_STATS"):
+        case "json":
+            print(json.dumps(stats, indent=1), file=sys.stderr)
+        case "table" | "1":
+            print(cache_stats_table(stats), file=sys.stderr)
+        case path:
+            # One JSON line per process, to be aggregated later.
+            with open(path, "a") as f:
+                f.write(json.dumps({"argv": sys.argv, "stats": stats}) + "\n")
+
+
+if os.getenv("CQ_CACHE_STATS") not in (None, "", "0"):
+    atexit.register(_dump_cache_stats)
+
+
+def _pack_result(value, shapes):
+    """Describe a cq_cache result as a marshal-able layout.
+
+    Shapes are appended to the shapes list (as TopoDS_Shape) and referred to
+    by index. See `_unpack_result`.
+    """
+    from OCP.TopoDS import TopoDS_Shape
+
+    def add(shape):
+        for i, existing in enumerate(shapes):
+            if existing.IsEqual(shape):
+                return i
+        shapes.append(shape)
+        return len(shapes) - 1
+
+    match value:
+        case Lazy():
+            return _pack_result(value.evaluate(), shapes)
+        case cq.Workplane():
+            vals = value.vals()
+            if not all(isinstance(v, cq.Shape) for v in vals):
+                raise TypeError(f"cq_cache cannot wrap Workplane of {vals}")
+            return ("Workplane", [add(v.wrapped) for v in vals])
+        case cq.Shape():
+            return ("Shape", add(value.wrapped))
+        case TopoDS_Shape():
+            return ("TopoDS_Shape", add(value))
+        case dict():
+            return ("dict", [(k, _pack_result(v, shapes)) for k, v in value.items()])
+        case list() | tuple():
+            kind = type(value).__name__
+            return (kind, [_pack_result(v, shapes) for v in value])
+        case None | bool() | int() | float() | str():
+            return ("value", value)
+        case _:
+            raise TypeError(f"cq_cache cannot wrap {type(value)} objects")
+
+
+def _unpack_result(layout, shapes):
+    """Rebuild a value described by `_pack_result` from TopoDS_Shapes."""
+    kind, data = layout
+    match kind:
+        case "Workplane":
+            vals = [cq.Shape.cast(shapes[i]) for i in data]
+            if len(vals) == 1:
+                # Cast to Solid/Compound. A plain cq.Shape is not found by
+                # findSolid(), which makes obj1.union(obj2) ignore obj1.
+                return cq.Workplane(obj=vals[0])
+            return cq.Workplane().newObject(vals)
+        case "Shape":
+            return cq.Shape.cast(shapes[data])
+        case "TopoDS_Shape":
+            return shapes[data]
+        case "dict":
+            return {k: _unpack_result(v, shapes) for k, v in data}
+        case "list":
+            return [_unpack_result(v, shapes) for v in data]
+        case "tuple":
+            return tuple(_unpack_result(v, shapes) for v in data)
+        case "value":
+            return data
+
+
+def _make_compound(shapes):
+    from OCP.BRep import BRep_Builder
+    from OCP.TopoDS import TopoDS_Compound
+
+    compound = TopoDS_Compound()
+    builder = BRep_Builder()
+    builder.MakeCompound(compound)
+    for shape in shapes:
+        builder.Add(compound, shape)
+    return compound
+
+
+def _compound_children(compound):
+    from OCP.TopoDS import TopoDS_Iterator
+
+    children = []
+    it = TopoDS_Iterator(compound)
+    while it.More():
+        children.append(it.Value())
+        it.Next()
+    return children
+
+
+# export() calls made while cached functions run, innermost last. See cq_cache.
+_recording_stack = []
 
 
 # based on https://github.com/CadQuery/cadquery-plugins/blob/main/plugins/cq_cache/cq_cache.py
 def cq_cache(function):
     """
-    This function save the model created by the cached function as a BREP file and
-    loads it if the cached function is called several time with the same arguments.
+    This function save the model created by the cached function and loads it if
+    the cached function is called several time with the same arguments.
+
+    The function can return a shape, a Workplane, or dicts, lists and tuples
+    of them (plain values like numbers are kept too). Calls to `export` made
+    by the function are recorded, and replayed when the result is loaded from
+    the cache.
+
+    Parsed shapes are kept in memory, backed by a packed on-disk store. See
+    `cache_store` for configuration. Meshes computed for export are stored
+    with the shapes.
+
+    The cache key covers the source of the function and of the functions it
+    calls, the globals and closure variables they read (shapes included), and
+    the cadquery/OCP versions. See `_cache_key`.
+
+    Hits, misses and timings are counted per function. See `cache_stats`. Set
+    CQ_CACHE_STATS to "table" or "json" to print them to stderr at exit, or to
+    a file path to append them there as a JSON line. "0" disables it.
 
     Note that it is primarly made for caching function with simple types as argument.
     """
-    import hashlib
-    import io
-    import marshal
-    import tempfile
+    name = function.__qualname__
 
-    from OCP.TopoDS import TopoDS_Shape
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        store = cache_store()
+        start = time.perf_counter()
+        key = _cache_key(function, args, kwargs)
+        key_time = time.perf_counter() - start
+        hit = store.get(key)
+        if hit is None:
+            # Single flight: if another process is computing the same key,
+            # wait for it and use its result.
+            with store.lock(key):
+                hit = store.get(key)
+                if hit is None:
+                    load_time = time.perf_counter() - start - key_time
+                    return compute(key, args, kwargs, key_time, load_time)
+        meta, compound, size = hit
+        shapes = _compound_children(compound)
+        result = _unpack_result(meta["layout"], shapes)
+        load_time = time.perf_counter() - start - key_time
+        _count_cache_stats(
+            name,
+            calls=1,
+            hits=1,
+            memory_hits=int(size == 0),
+            bytes_read=size,
+            key_time=key_time,
+            load_time=load_time,
+            saved_time=meta["build_time"] - key_time - load_time,
+        )
+        if _defer_clean:
+            # The result might skip clean(), see deferred_clean().
+            _skipped_clean(result)
+        for obj, part, filename, print_from_face in meta["exports"]:
+            obj = _unpack_result(obj, shapes)
+            if _defer_clean:
+                _skipped_clean(obj)
+            _export(obj, part, filename, print_from_face, cache=True)
+        return result
+
+    def compute(key, args, kwargs, key_time, load_time):
+        start = time.perf_counter()
+        exports = []
+        _recording_stack.append(exports)
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            _recording_stack.pop()
+        build_time = time.perf_counter() - start
+        shapes = []
+        meta = {
+            "layout": _pack_result(result, shapes),
+            "exports": [
+                (_pack_result(obj, shapes), part, filename, print_from_face)
+                for obj, part, filename, print_from_face in exports
+            ],
+            "build_time": build_time,
+        }
+        start = time.perf_counter()
+        size, stored = cache_store().put(key, meta, _make_compound(shapes))
+        # Return what later hits return, bit for bit, so results do not
+        # depend on whether the cache was warm.
+        result = _unpack_result(meta["layout"], _compound_children(stored))
+        if _defer_clean:
+            _skipped_clean(result)
+        write_time = time.perf_counter() - start
+        _count_cache_stats(
+            name,
+            calls=1,
+            misses=1,
+            bytes_written=size,
+            key_time=key_time,
+            load_time=load_time,
+            build_time=build_time,
+            write_time=write_time,
+            saved_time=-key_time - load_time - write_time,
+        )
+        return result
+
+    return wrapper
 
-    TEMPDIR_PATH = tempfile.gettempdir()
-    CACHE_DIR_NAME = "cq-cache"
-    CACHE_DIR_PATH = os.path.join(TEMPDIR_PATH, CACHE_DIR_NAME)
-    CQ_TYPES = {
-        cq.Shape,
-        cq.Solid,
-        cq.Shell,
-        cq.Compound,
-        cq.Face,
-        cq.Wire,
-        cq.Edge,
-        cq.Vertex,
-        TopoDS_Shape,
-        cq.Workplane,
-    }
-
-    os.makedirs(CACHE_DIR_PATH, exist_ok=True)
-
-    def import_brep(f):
-        # similar to cq.Shape.importBrep, but skips IsNull check
-        from OCP.BRep import BRep_Builder
-        from OCP.BRepTools import BRepTools
-
-        s = TopoDS_Shape()
-        builder = BRep_Builder()
-        ret = BRepTools.Read_s(s, f, builder)
-        if ret is False:
-            raise ValueError("Could not import BREP")
-        return s
-
-    def build_file_path(f, *args, **kwargs):
-        """File path for hashed (f, args, kwargs)"""
-        # might raise for non-basic types
-        v = marshal.dumps((f.__code__, f.__defaults__, f.__kwdefaults__, args, kwargs))
-        file_name = hashlib.blake2s(v).hexdigest()
-        file_path = os.path.join(CACHE_DIR_PATH, file_name)
-        return file_path
-
-    def return_right_wrapper(source, type_name):
-        target = next(x for x in CQ_TYPES if x.__name__ == type_name)
-        if target is cq.Workplane:
-            shape = cq.Shape(source)
-            shape = cq.Workplane(obj=shape)
-            # This is a no-op, but it works around an issue that
-            # obj1.union(obj2) when both objs are returned from the
-            # below line, the first obj1 is ignored somehow.
-            shape = cq.Workplane().union(shape)
+
+_boolean_cache = os.getenv("CQ_CACHE_BOOLEANS") not in (None, "", "0")
+
+
+def cache_booleans(enabled=True):
+    """Cache each fuse/cut/intersect/clean result in cache_store().
+
+    Results are keyed by the operation, its options, and fingerprints of the
+    operands. A result is in turn fingerprinted by the key that made it, so
+    long chains of booleans are loaded without serializing anything to hash.
+
+    Off by default. Also enabled by setting CQ_CACHE_BOOLEANS=1.
+    """
+    global _boolean_cache
+    _boolean_cache = enabled
+
+
+def _cache_operation(cls, name):
+    """Patch cls.name (a boolean or clean) to go through cache_store()."""
+    original = cls.__dict__[name]
+    stat_name = f"{name} (boolean)"
+
+    @wraps(original)
+    def method(self, *args, **kwargs):
+        if not _boolean_cache:
+            return original(self, *args, **kwargs)
+        start = time.perf_counter()
+        desc = (
+            "operation",
+            _versions(),
+            _CacheStore.FORMAT,
+            cls.__name__,
+            name,
+            [_shape_fingerprint(s) for s in (self, *args)],
+            sorted(kwargs.items()),
+        )
+        key = hashlib.blake2s(marshal.dumps(desc)).hexdigest()
+        key_time = time.perf_counter() - start
+        restore = self.__class__ if name == "clean" else cq.Shape.cast
+        store = cache_store()
+        hit = store.get(key)
+        if hit is not None:
+            meta, shape, size = hit
+            result = restore(shape)
+            load_time = time.perf_counter() - start - key_time
+            _count_cache_stats(
+                stat_name,
+                calls=1,
+                hits=1,
+                memory_hits=int(size == 0),
+                bytes_read=size,
+                key_time=key_time,
+                load_time=load_time,
+                saved_time=meta["build_time"] - key_time - load_time,
+            )
         else:
-            cast = getattr(target, "cast") or target
-            shape = cast(source)
-        return shape
+            load_time = time.perf_counter() - start - key_time
+            start = time.perf_counter()
+            result = original(self, *args, **kwargs)
+            build_time = time.perf_counter() - start
+            size, stored = store.put(key, {"build_time": build_time}, result.wrapped)
+            # Same as a later hit, bit for bit. See cq_cache.
+            result = restore(stored)
+            write_time = time.perf_counter() - start - build_time
+            _count_cache_stats(
+                stat_name,
+                calls=1,
+                misses=1,
+                bytes_written=size,
+                key_time=key_time,
+                load_time=load_time,
+                build_time=build_time,
+                write_time=write_time,
+                saved_time=-key_time - load_time - write_time,
+            )
+        _fingerprints[result] = (result.wrapped.Orientation(), key)
+        return result
+
+    setattr(cls, name, method)
+
+
+for _cls, _name in [
+    (cq.Shape, "fuse"),
+    (cq.Shape, "cut"),
+    (cq.Shape, "intersect"),
+    (cq.Shape, "clean"),
+    (cq.Compound, "fuse"),
+    (cq.Compound, "cut"),
+    (cq.Compound, "intersect"),
+]:
+    _cache_operation(_cls, _name)
+
+
+def _skip_missed_tools(cls):
+    """Patch cls.cut to drop tools outside the bounding box of the shape.
+
+    Cutting with no tools left returns the shape itself, without a boolean.
+    """
+    original = cls.__dict__["cut"]
 
-    @wraps(function)
+    @wraps(original)
+    def cut(self, *toCut, **kwargs):
+        box = _bnd_box(self)
+        tools = [t for t in toCut if not box.IsOut(_bnd_box(t))]
+        if not tools:
+            return self
+        return original(self, *tools, **kwargs)
+
+    cls.cut = cut
+
+
+_skip_missed_tools(cq.Shape)
+_skip_missed_tools(cq.Compound)
+
+
+_memo_enabled = os.getenv("CQ_MEMO") not in (None, "", "0")
+_memo = OrderedDict()  # key -> (shape, build_time), least recently used first
+_MEMO_SIZE = 256  # results kept alive, see memoize()
+
+
+def memoize(enabled=True):
+    """Reuse shapes that are built again from identical inputs in this process.
+
+    Primitives (Solid.makeBox, makeCylinder, ...), translate, rotate and
+    fuse/cut/intersect/clean are looked up by their inputs: numbers and
+    vectors by value, shapes by identity (TShape, location and orientation).
+    A repeated call returns the shape built by the first one, sharing its
+    TShape, so repeated operations on the result are found again too.
+
+    The shared TShape also shares its triangulation: once one of the results
+    is exported (or otherwise meshed), the others carry that mesh too, and
+    BoundingBox() (so align()) uses it. That is the same as exporting the
+    shape first and then reusing it, and differs from rebuilding it.
+
+    The last 256 results are kept alive. Off by default, as that, and the
+    shared triangulations, change what existing scripts hold and see. Also
+    enabled by setting CQ_MEMO=1.
+
+    Args:
+        enabled: Whether to look up and remember shapes.
+
+    Returns:
+        The previous setting, to restore it later.
+    """
+    global _memo_enabled
+    previous, _memo_enabled = _memo_enabled, enabled
+    if not enabled:
+        _memo.clear()
+    return previous
+
+
+class _ShapeKey:
+    """Dict key for a shape: its TShape by identity, location by value.
+
+    OCCT compares locations by identity, and each Workplane.box() call moves
+    the box by a new location, so the location is compared by its matrix.
+    Compounds are compared by their children, as new compounds of the same
+    shapes are made all the time (ex. by Workplane.union()).
+    """
+
+    __slots__ = ("tshape", "placement", "hash")
+
+    def __init__(self, shape):
+        from OCP.TopAbs import TopAbs_COMPOUND
+        from OCP.TopLoc import TopLoc_Location
+        from OCP.TopoDS import TopoDS_Iterator
+
+        trsf = shape.Location().Transformation()
+        self.placement = (
+            shape.Orientation().value,
+            *(trsf.Value(i, j) for i in range(1, 4) for j in range(1, 5)),
+        )
+        if shape.ShapeType() == TopAbs_COMPOUND:
+            children = TopoDS_Iterator(shape, False, False)
+            self.tshape = []
+            while children.More():
+                self.tshape.append(_ShapeKey(children.Value()))
+                children.Next()
+            self.tshape = tuple(self.tshape)
+            self.hash = hash((self.tshape, self.placement))
+        else:
+            # A handle of its own, not affected by Shape.move() on the original.
+            self.tshape = shape.Located(TopLoc_Location())
+            self.hash = hash((hash(self.tshape), self.placement))
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        if not isinstance(other, _ShapeKey) or self.placement != other.placement:
+            return False
+        if isinstance(self.tshape, tuple) or isinstance(other.tshape, tuple):
+            return self.tshape == other.tshape
+        return self.tshape.IsSame(other.tshape)
+
+
+def _memo_key(value):
+    match value:
+        case cq.Shape():
+            return _ShapeKey(value.wrapped)
+        case tuple() | list():
+            return (type(value).__name__, *map(_memo_key, value))
+        case type():
+            return value.__qualname__
+    return _describe(value, {}, strict=True)
+
+
+def _shared(shape):
+    """A new Shape object sharing the TShape and location of shape."""
+    return shape.__class__(shape.wrapped.Located(shape.wrapped.Location()))
+
+
+def _memoize_operation(cls, name):
+    """Patch cls.name to return the remembered result of identical calls."""
+    original = cls.__dict__[name]
+    func = original.__func__ if isinstance(original, classmethod) else original
+    stat_name = f"{name} (memo)"
+
+    @wraps(func)
+    def method(self, *args, **kwargs):
+        if not _memo_enabled:
+            return func(self, *args, **kwargs)
+        try:
+            key = (cls.__name__, name, _memo_key(self))
+            key += tuple(_memo_key(a) for a in args)
+            key += tuple((k, _memo_key(v)) for k, v in sorted(kwargs.items()))
+        except TypeError:
+            return func(self, *args, **kwargs)
+        return _memo_call(key, stat_name, lambda: func(self, *args, **kwargs))
+
+    if isinstance(original, classmethod):
+        method = classmethod(method)
+    setattr(cls, name, method)
+
+
+def _memo_call(key, stat_name, build):
+    """Return the shape remembered for key, or build() and remember it."""
+    hit = _memo.get(key)
+    if hit is not None:
+        _memo.move_to_end(key)
+        shape, build_time = hit
+        _count_cache_stats(
+            stat_name, calls=1, hits=1, memory_hits=1, saved_time=build_time
+        )
+        return _shared(shape)
+    start = time.perf_counter()
+    result = build()
+    build_time = time.perf_counter() - start
+    if isinstance(result, cq.Shape):
+        _memo[key] = (_shared(result), build_time)
+        if len(_memo) > _MEMO_SIZE:
+            _memo.popitem(last=False)
+    _count_cache_stats(stat_name, calls=1, misses=1, build_time=build_time)
+    return result
+
+
+def _primitive(func):
+    """Wrap func, which returns a Shape, to return a Workplane of the shape
+    remembered for identical arguments (see memoize)."""
+    signature = inspect.signature(func)
+    stat_name = f"{func.__name__} (memo)"
+
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        file_path = build_file_path(function, *args, **kwargs)
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                v = marshal.load(f)
-            shape = import_brep(io.BytesIO(v["brep"]))
-            return return_right_wrapper(shape, v["type_name"])
-        shape = function(*args, **kwargs)
-        shape_type = type(shape)
-        if shape_type is W:
-            shape_type = cq.Workplane
-        if shape_type not in CQ_TYPES:
-            raise TypeError(f"cq_cache cannot wrap {shape_type} objects")
+        build = partial(func, *args, **kwargs)
+        if not _memo_enabled:
+            return W(build())
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
         try:
-            shape_export = shape.val()
-        except AttributeError:
-            shape_export = shape
-        buf = io.BytesIO()
-        shape_export.exportBrep(buf)
-        with open(file_path, "wb") as f:
-            marshal.dump({"type_name": shape_type.__name__, "brep": buf.getvalue()}, f)
-        return shape
+            key = ("primitive", func.__qualname__)
+            key += tuple((k, _memo_key(v)) for k, v in bound.arguments.items())
+        except TypeError:
+            return W(build())
+        return W(_memo_call(key, stat_name, build))
 
     return wrapper
 
 
+for _cls, _name in [
+    (cq.Solid, "makeBox"),
+    (cq.Solid, "makeCone"),
+    (cq.Solid, "makeCylinder"),
+    (cq.Solid, "makeSphere"),
+    (cq.Solid, "makeTorus"),
+    (cq.Solid, "makeWedge"),
+    (cq.Shape, "translate"),
+    (cq.Shape, "rotate"),
+    (cq.Shape, "fuse"),
+    (cq.Shape, "cut"),
+    (cq.Shape, "intersect"),
+    (cq.Shape, "clean"),
+    (cq.Compound, "fuse"),
+    (cq.Compound, "cut"),
+    (cq.Compound, "intersect"),
+]:
+    _memoize_operation(_cls, _name)
+
+
+_parallel = os.getenv("CQ_PARALLEL") != "0"
+
+
+def parallel(enabled=True, threads=None):
+    """Run OCCT booleans and export meshing on multiple threads.
+
+    Applies to every fuse/cut/intersect (so union_all, cut_all and the
+    Workplane methods) and to export(). Results do not depend on it.
+
+    On by default, using one thread per CPU. Also configured by setting
+    CQ_PARALLEL=0 and CQ_THREADS=N.
+
+    Args:
+        enabled: Whether OCCT may split work across threads.
+        threads: Size of OCCT's thread pool, or None for one per CPU.
+    """
+    from OCP.OSD import OSD_ThreadPool
+
+    global _parallel
+    _parallel = enabled
+    OSD_ThreadPool.DefaultPool_s().Init(threads or -1)
+
+
+def _patch_bool_op():
+    """Make cq.Shape._bool_op follow parallel() instead of always running parallel."""
+    original = cq.Shape._bool_op
+
+    @wraps(original)
+    def _bool_op(self, args, tools, op, parallel=True):
+        if _boolean_timeout:
+            return _watched_bool_op(args, tools, op, parallel and _parallel)
+        return original(self, args, tools, op, parallel and _parallel)
+
+    cq.Shape._bool_op = _bool_op
+
+
+_patch_bool_op()
+if os.getenv("CQ_THREADS"):
+    parallel(_parallel, int(os.getenv("CQ_THREADS")))
+
+
+_boolean_timeout = float(os.getenv("CQ_BOOLEAN_TIMEOUT") or 0)
+
+# Retries after a timeout: (fuzzy value, reverse operands).
+_BOOLEAN_RETRIES = [(None, True), (1e-5, False), (1e-4, False), (1e-3, False)]
+
+
+def boolean_timeout(seconds):
+    """Run each fuse/cut/intersect in a worker process, under a time budget.
+
+    OCCT cannot be interrupted, so a boolean that hangs would stall the
+    whole script. Operands are sent to a worker process as BREP bytes, and
+    the worker is killed if it does not answer in time. The boolean is then
+    retried with its operands in a different order (fuse and intersect
+    only), and with increasing fuzzy values. Each retry is reported to stderr with the line that
+    called the boolean. TimeoutError is raised if all retries time out.
+
+    Off by default. Also enabled by setting CQ_BOOLEAN_TIMEOUT=<seconds>.
+
+    Args:
+        seconds: Time budget of each attempt, or 0 to turn off.
+    """
+    global _boolean_timeout
+    _boolean_timeout = seconds
+    if seconds:
+        _boolean_worker.start()
+
+
+class _BooleanWorker:
+    """A `cqutils.py boolean-worker` process, started on first use."""
+
+    def __init__(self):
+        self.proc = None
+        self.ready = False
+
+    def start(self):
+        """Start the process, without waiting for it to import cadquery."""
+        if self.proc is None:
+            self.proc = subprocess.Popen(
+                [sys.executable, os.path.realpath(__file__), "boolean-worker"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            self.ready = False
+
+    def run(self, request, timeout):
+        """Send request, return the reply, or raise TimeoutError."""
+        self.start()
+        if not self.ready:
+            # Importing cadquery has a time budget of its own, so a worker
+            # stuck on import does not block the script either.
+            self.read(timeout)
+            self.ready = True
+        _write_message(self.proc.stdin, request)
+        return self.read(timeout)
+
+    def read(self, timeout):
+        """The next message of the worker, or raise TimeoutError."""
+        replies = []
+        reader = threading.Thread(
+            target=lambda: replies.append(_read_message(self.proc.stdout)),
+            daemon=True,
+        )
+        reader.start()
+        reader.join(timeout)
+        if not replies:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+            raise TimeoutError(f"no reply in {timeout}s")
+        if replies[0] is None:
+            self.proc = None
+            raise RuntimeError("boolean worker exited")
+        return replies[0]
+
+
+_boolean_worker = _BooleanWorker()
+if _boolean_timeout and __name__ != "__main__":
+    _boolean_worker.start()
+
+
+def _write_message(f, value):
+    data = marshal.dumps(value)
+    f.write(len(data).to_bytes(8, "little") + data)
+    f.flush()
+
+
+def _read_message(f):
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    return marshal.loads(f.read(int.from_bytes(header, "little")))
+
+
+def _shape_bytes(shape):
+    buf = io.BytesIO()
+    _write_bin(shape.wrapped, buf)
+    return buf.getvalue()
+
+
+def _call_site():
+    """file:line of the innermost caller outside cqutils and cadquery."""
+    frame = sys._getframe(1)
+    while frame.f_back and (
+        frame.f_globals is globals()
+        or frame.f_globals.get("__name__", "").startswith("cadquery")
+    ):
+        frame = frame.f_back
+    return f"{frame.f_code.co_filename}:{frame.f_lineno}"
+
+
+def _watched_bool_op(args, tools, op, parallel):
+    """cq.Shape._bool_op, run by _boolean_worker under _boolean_timeout."""
+    op_name = type(op).__name__
+    fuzzy = op.FuzzyValue()
+    glue = int(op.Glue().value)
+    args, tools = [_shape_bytes(s) for s in args], [_shape_bytes(s) for s in tools]
+    attempts = [(fuzzy, False)] + [
+        (max(fuzzy, retry_fuzzy or 0), reverse)
+        for retry_fuzzy, reverse in _BOOLEAN_RETRIES
+    ]
+    site = None
+    tried = set()
+    for attempt_fuzzy, reverse in attempts:
+        request_args, request_tools = args, tools
+        if reverse:
+            # Only fuse and common are symmetric.
+            if op_name not in ("BRepAlgoAPI_Fuse", "BRepAlgoAPI_Common"):
+                continue
+            reversed_tools = tools[::-1]
+            request_args = reversed_tools[:1]
+            request_tools = args + reversed_tools[1:]
+        request = (op_name, attempt_fuzzy, glue, parallel, request_args, request_tools)
+        # Sending a request that timed out again would only time out again.
+        attempt = (attempt_fuzzy, tuple(request_args), tuple(request_tools))
+        if attempt in tried:
+            continue
+        tried.add(attempt)
+        try:
+            status, value = _boolean_worker.run(request, _boolean_timeout)
+        except TimeoutError:
+            site = site or _call_site()
+            print(
+                f"cqutils: {op_name} at {site} took over {_boolean_timeout}s"
+                f" (fuzzy {attempt_fuzzy}, reversed {reverse})",
+                file=sys.stderr,
+            )
+            continue
+        if status != "ok":
+            raise ValueError(value)
+        return cq.Shape.cast(_read_bin(io.BytesIO(value)))
+    raise TimeoutError(f"{op_name} at {site} timed out in all attempts")
+
+
+def _serve_booleans(stdin, stdout):
+    """Worker side of _watched_bool_op."""
+    import OCP.BRepAlgoAPI
+    from OCP.BOPAlgo import BOPAlgo_GlueEnum
+
+    _write_message(stdout, "ready")
+    while (request := _read_message(stdin)) is not None:
+        op_name, fuzzy, glue, parallel, args, tools = request
+        op = getattr(OCP.BRepAlgoAPI, op_name)()
+        op.SetFuzzyValue(fuzzy)
+        op.SetGlue(BOPAlgo_GlueEnum(glue))
+        args = [cq.Shape.cast(_read_bin(io.BytesIO(b))) for b in args]
+        tools = [cq.Shape.cast(_read_bin(io.BytesIO(b))) for b in tools]
+        try:
+            result = args[0]._bool_op(args, tools, op, parallel)
+            reply = ("ok", _shape_bytes(result))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        _write_message(stdout, reply)
+
+
+_defer_clean = os.getenv("CQ_CLEAN") == "defer"
+_unclean = weakref.WeakSet()  # shapes that skipped clean(), see _finish_clean
+_unify = cq.Shape.clean
+
+
+@contextmanager
+def deferred_clean(enabled=True):
+    """Skip clean() in the block. export() and show() clean once instead.
+
+    cadquery cleans (merges faces with ShapeUpgrade_UnifySameDomain) after
+    every union, cut and intersect, so a long chain cleans at every step.
+    The faces merged at the end are the same, but their triangulation, and
+    so the STL, might differ slightly.
+
+    Also enabled for the whole script by setting CQ_CLEAN=defer. cq_cache
+    keeps results built this way apart from cleaned ones.
+
+    Args:
+        enabled: Whether to skip clean().
+    """
+    global _defer_clean
+    saved = _defer_clean
+    _defer_clean = enabled
+    try:
+        yield
+    finally:
+        _defer_clean = saved
+
+
+def _skipped_clean(value):
+    """Remember that the shapes in value skipped clean()."""
+    match value:
+        case cq.Shape():
+            _unclean.add(value)
+        case cq.Workplane():
+            for v in value.objects:
+                _skipped_clean(v)
+        case dict():
+            for v in value.values():
+                _skipped_clean(v)
+        case list() | tuple():
+            for v in value:
+                _skipped_clean(v)
+
+
+def _is_unclean(shape):
+    """Whether shape, or a part of it if it is a compound, skipped clean()."""
+    if shape in _unclean:
+        return True
+    return isinstance(shape, cq.Compound) and any(map(_is_unclean, shape))
+
+
+def _patch_clean():
+    original = cq.Shape.clean
+
+    @wraps(original)
+    def clean(self):
+        if _defer_clean:
+            _skipped_clean(self)
+            return self
+        return original(self)
+
+    cq.Shape.clean = clean
+
+    # Moved copies of a shape that skipped clean() skipped it too. Shapes
+    # compare by TShape and location, and move() and locate() change the
+    # location in place, so the shape is taken out of the set meanwhile.
+    for name in [
+        "translate",
+        "rotate",
+        "mirror",
+        "scale",
+        "transformShape",
+        "transformGeometry",
+        "moved",
+        "located",
+        "move",
+        "locate",
+        "copy",
+    ]:
+        move = getattr(cq.Shape, name)
+
+        @wraps(move)
+        def method(self, *args, _move=move, **kwargs):
+            unclean = bool(_unclean) and self in _unclean
+            if unclean:
+                _unclean.discard(self)
+            result = _move(self, *args, **kwargs)
+            if unclean:
+                _unclean.add(self)
+                _unclean.add(result)
+            return result
+
+        setattr(cq.Shape, name, method)
+
+
+def _finish_clean(obj):
+    """Run the clean() skipped by deferred_clean(), once for obj."""
+    if not _unclean:
+        return obj
+    if isinstance(obj, cq.Shape):
+        return _unify(obj) if _is_unclean(obj) else obj
+    vals = obj.vals()
+    unclean = [isinstance(v, cq.Shape) and _is_unclean(v) for v in vals]
+    if not any(unclean):
+        return obj
+    return obj.newObject([_unify(v) if u else v for v, u in zip(vals, unclean)])
+
+
+_patch_clean()
+
+
+@lru_cache(maxsize=1024)
+def _parse_selector(text):
+    """cq.selectors.StringSyntaxSelector(text), parsed once per string."""
+    return cq.selectors.StringSyntaxSelector(text)
+
+
+class _SelectionTable:
+    """Sub-shapes of the objects on a Workplane stack, with NumPy columns for
+    selectors. Columns are computed on first use, then reused by every later
+    selection on the same objects.
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.index = None  # sub-shape -> position, for other selectors
+
+    @cached_property
+    def geom_types(self):
+        import numpy as np
+
+        return np.array([o.geomType() for o in self.objects])
+
+    @cached_property
+    def centers(self):
+        import numpy as np
+
+        return np.array([o.Center().toTuple() for o in self.objects]).reshape(-1, 3)
+
+    @cached_property
+    def directions(self):
+        """Normals of planar faces and directions of lines, like BaseDirSelector.
+
+        NaN for other sub-shapes, which direction selectors skip.
+        """
+        import numpy as np
+        from OCP.BRepAdaptor import BRepAdaptor_Curve, BRepAdaptor_Surface
+        from OCP.TopAbs import TopAbs_REVERSED
+
+        rows = []
+        for o, geom_type in zip(self.objects, self.geom_types):
+            match o, geom_type:
+                case cq.Face(), "PLANE":
+                    # Same as Face.normalAt(None): dU x dV, reversed with the
+                    # face.
+                    pos = BRepAdaptor_Surface(o.wrapped).Plane().Position()
+                    normal = pos.XDirection().Crossed(pos.YDirection())
+                    if o.wrapped.Orientation() == TopAbs_REVERSED:
+                        normal.Reverse()
+                    rows.append((normal.X(), normal.Y(), normal.Z()))
+                case cq.Edge(), "LINE":
+                    line = BRepAdaptor_Curve(o.wrapped).Line().Direction()
+                    rows.append((line.X(), line.Y(), line.Z()))
+                case _:
+                    rows.append((math.nan,) * 3)
+        return np.array(rows).reshape(-1, 3)
+
+    def select(self, selector):
+        """Positions of the sub-shapes selected by selector, in cadquery's order."""
+        import numpy as np
+
+        s = cq.selectors
+        match selector:
+            case s.StringSyntaxSelector() | s._SimpleStringSyntaxSelector():
+                return self.select(selector.mySelector)
+            case s.AndSelector() | s.SumSelector() | s.SubtractSelector():
+                left = self._mask(self.select(selector.left))
+                right = self._mask(self.select(selector.right))
+                match selector:
+                    case s.AndSelector():
+                        return np.flatnonzero(left & right)
+                    case s.SumSelector():
+                        return np.flatnonzero(left | right)
+                return np.flatnonzero(left & ~right)
+            case s.InverseSelector():
+                return np.flatnonzero(~self._mask(self.select(selector.selector)))
+            case s.DirectionNthSelector():
+                parallel = s.ParallelDirSelector(selector.direction, selector.tolerance)
+                return self._nth(selector, self.select(parallel))
+            case (
+                s.ParallelDirSelector()
+                | s.DirectionSelector()
+                | s.PerpendicularDirSelector()
+            ):
+                return self._directions(selector)
+            case s.TypeSelector():
+                return np.flatnonzero(self.geom_types == selector.typeString)
+            case s.CenterNthSelector():
+                return self._nth(selector, np.arange(len(self.objects)))
+        if type(selector) is s.Selector:
+            return np.arange(len(self.objects))
+        if self.index is None:
+            self.index = {o: i for i, o in enumerate(self.objects)}
+        return np.array([self.index[o] for o in selector.filter(self.objects)], int)
+
+    def _mask(self, positions):
+        import numpy as np
+
+        mask = np.zeros(len(self.objects), bool)
+        mask[positions] = True
+        return mask
+
+    def _directions(self, selector):
+        import numpy as np
+
+        vectors = self.directions
+        direction = np.array(selector.direction.toTuple())
+        cross = np.linalg.norm(np.cross(direction, vectors), axis=1)
+        match selector:
+            case cq.selectors.ParallelDirSelector():
+                found = cross < selector.tolerance
+            case _:
+                # Vector.getAngle(), for a unit vector.
+                dot = vectors @ direction
+                angle = np.arctan2(cross, dot)
+                if isinstance(selector, cq.selectors.PerpendicularDirSelector):
+                    angle = np.abs(angle - math.pi / 2)
+                found = angle < selector.tolerance
+        return np.flatnonzero(found)
+
+    def _nth(self, selector, positions):
+        """Like _NthSelector.filter() on the sub-shapes at positions."""
+        import numpy as np
+
+        if len(positions) == 0:
+            raise ValueError("Can not return the Nth element of an empty list")
+        direction = np.array(selector.direction.toTuple())
+        keys = self.centers[positions] @ direction
+        order = np.argsort(keys, kind="stable")
+        keys, positions = keys[order], positions[order]
+        # Clusters of keys within tolerance of the first key of the cluster.
+        clusters = []
+        start = 0
+        while start < len(keys):
+            tolerance = selector.tolerance
+            end = np.searchsorted(keys, keys[start] + tolerance, side="right")
+            while end < len(keys) and keys[end] - keys[start] <= tolerance:
+                end += 1
+            while end > start + 1 and keys[end - 1] - keys[start] > tolerance:
+                end -= 1
+            clusters.append(positions[start:end])
+            start = end
+        if not selector.directionMax:
+            clusters.reverse()
+        try:
+            return clusters[selector.n]
+        except IndexError:
+            raise IndexError(
+                f"Attempted to access index {selector.n} of a list with length {len(clusters)}"
+            ) from None
+
+
+_selection_tables = OrderedDict()  # key -> _SelectionTable, least recently used first
+_SELECTION_TABLES_SIZE = 256
+
+
+def _patch_select_objects():
+    """Make Workplane.faces()/edges()/... select with cached _SelectionTable.
+
+    String selectors are parsed once. The sub-shapes of the objects on the
+    stack, and their centers, normals and types, are collected once per
+    objects and kept in NumPy arrays, so selecting is array operations.
+    """
+    original = cq.Workplane._selectObjects
+
+    @wraps(original)
+    def _selectObjects(self, objType, selector=None, tag=None):
+        cq_obj = self._getTagged(tag) if tag else self
+        objects = cq_obj.objects
+        if not objects or not all(isinstance(o, cq.Shape) for o in objects):
+            return original(self, objType, selector, tag)
+        # By identity (not _ShapeKey): sub-shapes must be IsSame() with the
+        # ones of the objects, ex. for Workplane.fillet().
+        key = (objType, *((_shared(o), o.wrapped.Orientation()) for o in objects))
+        table = _selection_tables.get(key)
+        if table is None:
+            table = _SelectionTable(cq_obj._collectProperty(objType))
+            _selection_tables[key] = table
+            if len(_selection_tables) > _SELECTION_TABLES_SIZE:
+                _selection_tables.popitem(last=False)
+        else:
+            _selection_tables.move_to_end(key)
+        if isinstance(selector, str):
+            selector = _parse_selector(selector)
+        found = table.select(selector) if selector else range(len(table.objects))
+        return _new_object(self, [_shared(table.objects[i]) for i in found])
+
+    cq.Workplane._selectObjects = _selectObjects
+
+
+def _new_object(obj, objlist):
+    """obj.newObject(objlist), without building a plane it throws away.
+
+    cadquery makes the new Workplane with Workplane(), which builds all twelve
+    named planes to pick "XY", then replaces that plane by a copy of its own.
+    That was most of the cost of a cached selection.
+    """
+    from copy import copy
+
+    ns = obj.__class__(copy(obj.plane))
+    ns.parent = obj
+    ns.objects = list(objlist)
+    ns.ctx = obj.ctx
+    return ns
+
+
+_patch_select_objects()
+
+
+def _workplane(obj):
+    """W(obj), on an XY plane built directly.
+
+    Workplane(shape) calls Plane.named("XY"), which builds all twelve named
+    planes to return one.
+    """
+    return W(cq.Plane((0, 0, 0), (1, 0, 0), (0, 0, 1)), obj=obj)
+
+
 @workplane_method
 def align(obj1, obj2=None, faces="", dx: float = 0, dy: float = 0, dz: float = 0):
     """Align obj1 to obj2 on faces (ex. ">X <Y").
@@ -142,12 +2043,15 @@ def align(obj1, obj2=None, faces="", dx: float = 0, dy: float = 0, dz: float = 0
         dy: Extra Y translation after face alignment.
         dz: Extra Z translation after face alignment.
     """
+    offset = [dx, dy, dz]
     if obj2 is not None:
         if isinstance(faces, str):
             faces = faces.split()
+        # Measured once: obj1 is moved once, by the sum of all steps.
+        bbox1 = _bounding_box(obj1.val())
+        bbox2 = _bounding_box(obj2.val())
+        steps = [0, 0, 0]
         for face in faces:
-            bbox1 = obj1.val().BoundingBox()
-            bbox2 = obj2.val().BoundingBox()
             if face.startswith(":"):
                 face1 = face2 = face[1:]
                 if "<" in face1:
@@ -159,43 +2063,55 @@ def align(obj1, obj2=None, faces="", dx: float = 0, dy: float = 0, dz: float = 0
                 face1 = face2 = "<" + face[1:]
                 match face[1:]:
                     case "X":
-                        dx += (bbox2.xlen - bbox1.xlen) / 2
+                        offset[0] += (bbox2.xlen - bbox1.xlen) / 2
                     case "Y":
-                        dy += (bbox2.ylen - bbox1.ylen) / 2
+                        offset[1] += (bbox2.ylen - bbox1.ylen) / 2
                     case "Z":
-                        dz += (bbox2.zlen - bbox1.zlen) / 2
+                        offset[2] += (bbox2.zlen - bbox1.zlen) / 2
             else:
                 face1 = face2 = face
 
             # Usually, faces(">Y") produces a "thin" (ymin = ymax) bounding box.
             # However, shapes like a cylinder does not have such "thin" faces.
             # So we need to handle them manually.
-            def fix_bbox(bbox, face):
+            def bound(bbox, face, axis):
                 if "<" in face:
                     method = min
                 elif ">" in face:
                     method = max
                 else:
-                    raise ValueError(f"fix_bbox: {face=} must have '>' or '<'")
-                if "X" in face:
-                    bbox.xmin = bbox.xmax = method(bbox.xmin, bbox.xmax)
-                elif "Y" in face:
-                    bbox.ymin = bbox.ymax = method(bbox.ymin, bbox.ymax)
-                elif "Z" in face:
-                    bbox.zmin = bbox.zmax = method(bbox.zmin, bbox.zmax)
-
-            fix_bbox(bbox1, face1)
-            fix_bbox(bbox2, face2)
-
-            cdx = cdy = cdz = 0
-            if "X" in face:
-                cdx = bbox2.xmin - bbox1.xmin
-            elif "Y" in face:
-                cdy = bbox2.ymin - bbox1.ymin
-            else:
-                cdz = bbox2.zmin - bbox1.zmin
-            obj1 = obj1.translate((cdx, cdy, cdz))
-    return obj1.translate((dx, dy, dz))
+                    raise ValueError(f"align: {face=} must have '>' or '<'")
+                name = "xyz"[axis]
+                return method(getattr(bbox, f"{name}min"), getattr(bbox, f"{name}max"))
+
+            axis = 0 if "X" in face else 1 if "Y" in face else 2
+            steps[axis] = bound(bbox2, face2, axis) - bound(bbox1, face1, axis)
+        offset = [o + s for o, s in zip(offset, steps)]
+    return _moved(obj1, cq.Location(cq.Vector(*offset)))
+
+
+def _rotation(axisStartPoint, axisEndPoint, angleDegrees):
+    """cq.Location rotating around the axis through two points."""
+    p1, p2 = cq.Vector(axisStartPoint), cq.Vector(axisEndPoint)
+    rotation = cq.Location(cq.Vector(), p2 - p1, angleDegrees)
+    return cq.Location(p1) * rotation * cq.Location(-p1)
+
+
+def _moved(obj, loc):
+    """obj moved by the cq.Location loc, sharing its geometry instead of copying it.
+
+    The shapes keep a single location: loc is combined with their current one.
+    """
+    match obj:
+        case Lazy():
+            return Lazy("move", (loc,), [obj])
+        case cq.Workplane():
+            return obj.newObject([_moved(o, loc) for o in obj.objects])
+        case cq.Shape():
+            trsf = loc.wrapped.Transformation()
+            trsf.Multiply(obj.wrapped.Location().Transformation())
+            return obj.located(cq.Location(trsf))
+    return obj
 
 
 @workplane_method
@@ -207,9 +2123,8 @@ def rotate_axis(obj, axis, degree):
         axis: One of "X", "Y", "Z".
         degree: Rotation angle in degrees.
     """
-    p1 = (0, 0, 0)
     p2 = (int(axis == "X"), int(axis == "Y"), int(axis == "Z"))
-    return obj.rotate(p1, p2, degree)
+    return _moved(obj, _rotation((0, 0, 0), p2, degree))
 
 
 @workplane_method
@@ -223,13 +2138,277 @@ def repeat(obj, n, x=0, y=0, z=0):
         y: Step distance on Y for each copy.
         z: Step distance on Z for each copy.
     """
-    h = n // 2
-    obj = obj.translate((-x * h, -y * h, -z * h))
-    objs = [obj]
-    for i in range(n - 1):
-        obj = obj.translate((x, y, z))
-        objs.append(obj)
-    return union_all(objs)
+    return union_all([_moved(obj, loc) for loc in linear_locations(n, x, y, z)])
+
+
+@workplane_method
+def pattern(obj, locations):
+    """Copies of obj moved to each location, sharing obj's geometry.
+
+    The copies are separate objects on the stack, so cut_all([tools]) or
+    union_all([...]) applies all of them in one boolean.
+
+    Args:
+        obj: Object to copy, usually a tool to cut.
+        locations: cq.Location of each copy, relative to obj. See
+            `linear_locations`, `grid_locations` and `polar_locations`.
+    """
+    shapes = [v for v in obj.vals() if isinstance(v, cq.Shape)]
+    return obj.newObject([_moved(v, loc) for loc in locations for v in shapes])
+
+
+def linear_locations(n, x=0, y=0, z=0, centered=True):
+    """Locations of n copies in a row, for `pattern`.
+
+    Args:
+        n: Number of copies.
+        x: Step distance on X.
+        y: Step distance on Y.
+        z: Step distance on Z.
+        centered: Center the row on the original, like `repeat`. Otherwise
+            the first copy is the original.
+    """
+    h = n // 2 if centered else 0
+    return [cq.Location(cq.Vector(x, y, z) * (i - h)) for i in range(n)]
+
+
+def grid_locations(nx, ny, x, y, centered=True):
+    """Locations of nx by ny copies on a XY grid, for `pattern`.
+
+    Args:
+        nx: Number of columns.
+        ny: Number of rows.
+        x: Step distance on X.
+        y: Step distance on Y.
+        centered: Center the grid on the original, like Workplane.rarray.
+            Otherwise the first copy is the original.
+    """
+    x0 = -x * (nx - 1) / 2 if centered else 0
+    y0 = -y * (ny - 1) / 2 if centered else 0
+    return [
+        cq.Location(cq.Vector(x0 + i * x, y0 + j * y, 0))
+        for i in range(nx)
+        for j in range(ny)
+    ]
+
+
+def polar_locations(n, axis="Z", angle=360, start=0):
+    """Locations of n copies rotated around a global axis, for `pattern`.
+
+    Like Workplane.polarArray(..., rotate=True) for the Z axis, with the
+    original placed at the radius.
+
+    Args:
+        n: Number of copies.
+        axis: One of "X", "Y", "Z".
+        angle: Total angle in degrees. 360 spreads the copies evenly,
+            otherwise the first and last copies are angle apart.
+        start: Angle of the first copy in degrees.
+    """
+    if abs(math.remainder(angle, 360)) < 1e-9:
+        step = angle / n
+    else:
+        step = angle / (n - 1) if n > 1 else 0
+    p2 = (int(axis == "X"), int(axis == "Y"), int(axis == "Z"))
+    return [_rotation((0, 0, 0), p2, start + step * i) for i in range(n)]
+
+
+def lazy(obj):
+    """Wrap a Workplane or shape as a Lazy expression. See `Lazy`."""
+    match obj:
+        case Lazy():
+            return obj
+        case cq.Shape():
+            return Lazy("leaf", (cq.Workplane(obj=obj),))
+        case cq.Workplane():
+            return Lazy("leaf", (obj,))
+    raise TypeError(f"cannot make {type(obj)} lazy")
+
+
+class Lazy:
+    """A CSG expression, evaluated when its shape is needed.
+
+    union, cut, cut_all, intersect, translate, rotate and rotate_axis add a
+    node to the expression instead of running OCCT. Anything else, like
+    measure, align, val or export, evaluates the expression and forwards to
+    the resulting Workplane. Workplanes returned by those are made lazy again.
+
+    Before evaluation the expression is simplified (see `_simplify_lazy`):
+    nested unions and chained cuts are flattened into one union_all/cut_all,
+    moves are combined and hoisted above booleans of equally moved operands,
+    and repeated operands, and empty ones of unions and cuts, are dropped.
+    Identical subexpressions, also across expressions, are evaluated once.
+    """
+
+    def __init__(self, op, args=(), children=()):
+        self.op = op
+        self.args = args
+        self.children = tuple(children)
+        self.empty = False
+        match op:
+            case "leaf":
+                vals = args[0].vals()
+                args_key = tuple(v if isinstance(v, cq.Shape) else id(v) for v in vals)
+                self.empty = not any(
+                    v.Solids() for v in vals if isinstance(v, cq.Shape)
+                )
+            case "move":
+                args_key = args[0].toTuple()
+            case _:
+                args_key = args
+        self.key = (op, args_key, tuple(c.key for c in self.children))
+        self.value = None
+        self.canonical = None
+
+    def __repr__(self):
+        return f"Lazy({self.op}, {len(self.children)} children)"
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = getattr(self.evaluate(), name)
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def method(*args, **kwargs):
+            result = value(*args, **kwargs)
+            return lazy(result) if isinstance(result, cq.Workplane) else result
+
+        return method
+
+    def union(self, *others):
+        return Lazy("union", (), [self, *map(lazy, filter(None, others))])
+
+    def cut(self, *tools):
+        return Lazy("cut", (), [self, *map(lazy, filter(None, tools))])
+
+    def cut_all(self, tools):
+        return self.cut(*tools)
+
+    def intersect(self, other):
+        return Lazy("intersect", (), [self, lazy(other)])
+
+    def translate(self, vec):
+        return _moved(self, cq.Location(cq.Vector(vec)))
+
+    def rotate(self, axisStartPoint, axisEndPoint, angleDegrees):
+        return _moved(self, _rotation(axisStartPoint, axisEndPoint, angleDegrees))
+
+    def rotate_axis(self, axis, degree):
+        return rotate_axis(self, axis, degree)
+
+    def export(self, part=None, filename=None, print_from_face="<Z"):
+        if filename is None and (_recording_stack or not _capturing_stack):
+            filename = _script_filename(sys._getframe(1))
+        result = export(self.evaluate(), part, filename, print_from_face)
+        return lazy(result) if result is not None else None
+
+    def show(self):
+        return lazy(_show(self.evaluate(), sys._getframe(1)))
+
+    def evaluate(self):
+        """The Workplane this expression stands for."""
+        if self.value is None:
+            node = self.simplified()
+            self.value = node.evaluate() if node is not self else self._run()
+        return self.value
+
+    def simplified(self):
+        if self.canonical is None:
+            children = [c.simplified() for c in self.children]
+            self.canonical = _make_lazy(self.op, self.args, children)
+        return self.canonical
+
+    def _run(self):
+        values = [c.evaluate() for c in self.children]
+        match self.op:
+            case "leaf":
+                return self.args[0]
+            case "union":
+                return union_all(values)
+            case "cut":
+                return values[0].cut_all(values[1:])
+            case "intersect":
+                return reduce(lambda a, b: a.intersect(b), values)
+            case "move":
+                return _moved(values[0], self.args[0])
+
+
+_lazy_nodes = weakref.WeakValueDictionary()  # key -> simplified Lazy
+
+
+def _make_lazy(op, args, children):
+    """Simplified, deduplicated node for op over simplified children."""
+    node = _simplify_lazy(op, args, children)
+    node = _lazy_nodes.setdefault(node.key, node)
+    node.canonical = node
+    return node
+
+
+def _simplify_lazy(op, args, children):
+    def flat(nodes, nested_op):
+        result = {}
+        for node in nodes:
+            for part in node.children if node.op == nested_op else [node]:
+                # Empty operands do not change a union, but empty an
+                # intersection. Keep them there, so it fails like eager.
+                if not part.empty or nested_op == "intersect":
+                    result.setdefault(part.key, part)
+        return list(result.values())
+
+    def hoist(nodes):
+        """The location all nodes are moved by, if they share one."""
+        if all(n.op == "move" for n in nodes):
+            locs = {n.key[1] for n in nodes}
+            if len(locs) == 1:
+                return nodes[0].args[0]
+
+    match op:
+        case "union" | "intersect":
+            children = flat(children, op)
+            if len(children) == 1:
+                return children[0]
+        case "cut":
+            base, tools = children[0], children[1:]
+            if base.op == "cut":
+                base, tools = base.children[0], [*base.children[1:], *tools]
+            tools = flat(tools, "union")
+            if not tools:
+                return base
+            if recut := _simplify_recut(base, tools):
+                return recut
+            children = [base, *tools]
+        case "move":
+            child = children[0]
+            if child.op == "move":
+                return _make_lazy("move", (args[0] * child.args[0],), child.children)
+            if args[0].toTuple() == ((0, 0, 0), (0, 0, 0)):
+                return child
+    if op != "move" and (loc := hoist(children)):
+        inner = _make_lazy(op, args, [c.children[0] for c in children])
+        return _make_lazy("move", (loc,), [inner])
+    return Lazy(op, args, children)
+
+
+def _simplify_recut(base, tools):
+    """Simplify (X | E) - T, where X = Y - T2 already has T (in T2) removed.
+
+    Then only E needs cutting: (X | E) - T = X | (E - T). If also T = T2 and
+    E is part of Y, E - T is part of X: (X | E) - T = X.
+    """
+    if base.op != "union" or base.children[0].op != "cut":
+        return None
+    x, *extras = base.children
+    y, *x_tools = x.children
+    tool_keys, x_tool_keys = {t.key for t in tools}, {t.key for t in x_tools}
+    if not tool_keys <= x_tool_keys:
+        return None
+    parts = {c.key for c in y.children} if y.op == "union" else {y.key}
+    if tool_keys == x_tool_keys and all(e.key in parts for e in extras):
+        return x
+    rest = _make_lazy("cut", (), [_make_lazy("union", (), extras), *tools])
+    return _make_lazy("union", (), [x, rest])
 
 
 _capturing_stack = []
@@ -252,6 +2431,21 @@ def export(obj, part=None, filename=None, print_from_face="<Z"):
         filename: Source script path; auto-detected when None.
         print_from_face: Face to place on print bed, one of <Z/>Z/<X/>X/<Y/>Y.
     """
+    if filename is None and (_recording_stack or not _capturing_stack):
+        filename = _script_filename(sys._getframe(1))
+    # Meshes are cached along with the results of cq_cache functions, and of
+    # booleans if they are cached. Otherwise only the STL file is written.
+    cache = bool(_recording_stack) or _boolean_cache
+    return _export(obj, part, filename, print_from_face, cache)
+
+
+def _export(obj, part, filename, print_from_face, cache):
+    """export() with a known filename. See _write_stl for cache."""
+    obj = _finish_clean(obj)
+    # Replayed by cq_cache when the calling function is loaded from cache.
+    for records in _recording_stack:
+        records.append((obj, part, filename, print_from_face))
+
     match print_from_face:
         case "<Z":
             pass
@@ -275,31 +2469,145 @@ def export(obj, part=None, filename=None, print_from_face="<Z"):
             raise ImportDone()
         return
 
-    if filename is None:
-        frame = inspect.stack()[1]
-        filename = frame.filename
-        if filename.endswith(">"):
-            # ex. "<cq_editor-string>". Try to get the filename.
-            filename = frame.frame.f_globals["__file__"]
-
     filename = os.path.basename(filename).rsplit(".", 1)[0]
     filename = filename.replace("_", "-")
     if part:
         filename += f"-{part}"
     out_dir = os.getenv("STL_OUT") or os.path.expanduser("~/stl")
     os.makedirs(out_dir, exist_ok=True)
-    cq.exporters.export(obj, os.path.join(out_dir, f"{filename}.stl"))
+    _write_stl(obj, os.path.join(out_dir, f"{filename}.stl"), cache=cache)
     return obj
 
 
+def _script_filename(frame):
+    """Path of the script running frame."""
+    filename = frame.f_code.co_filename
+    if filename.endswith(">"):
+        # ex. "<cq_editor-string>". Try to get the filename.
+        filename = frame.f_globals["__file__"]
+    return filename
+
+
+def _write_stl(obj, path, tolerance=0.1, angular_tolerance=0.1, cache=False):
+    """Write obj as binary STL, like cq.exporters.export.
+
+    With cache, the meshed shape is kept in cache_store(), keyed by its
+    geometry and the tolerances. Exporting an unchanged shape again reuses
+    the stored mesh instead of running BRepMesh.
+
+    Like cq.exporters.export, this leaves the triangulation attached to obj.
+    That matters beyond export: bounding boxes, and so align(), use it.
+    """
+    from cadquery.occ_impl.shapes import compound
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.StlAPI import StlAPI_Writer
+
+    shape = obj if isinstance(obj, cq.Shape) else compound(*obj)
+    if cache:
+        _cached_mesh(shape, tolerance, angular_tolerance)
+    else:
+        BRepMesh_IncrementalMesh(
+            shape.wrapped, tolerance, True, angular_tolerance, _parallel
+        )
+    writer = StlAPI_Writer()
+    writer.ASCIIMode = False
+    writer.Write(shape.wrapped, path)
+
+
+def _cached_mesh(shape, tolerance, angular_tolerance):
+    """Mesh shape, or attach its mesh from cache_store(). See _write_stl."""
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+
+    start = time.perf_counter()
+    key = hashlib.blake2s(
+        marshal.dumps(
+            (
+                "mesh",
+                _versions(),
+                _CacheStore.FORMAT,
+                _shape_fingerprint(shape),
+                tolerance,
+                angular_tolerance,
+            )
+        )
+    ).hexdigest()
+    key_time = time.perf_counter() - start
+    store = cache_store()
+    hit = store.get(key)
+    if hit is not None:
+        meta, mesh, size = hit
+        _copy_triangulation(mesh, shape.wrapped)
+        load_time = time.perf_counter() - start - key_time
+        _count_cache_stats(
+            "export (mesh)",
+            calls=1,
+            hits=1,
+            memory_hits=int(size == 0),
+            bytes_read=size,
+            key_time=key_time,
+            load_time=load_time,
+            saved_time=meta["build_time"] - key_time - load_time,
+        )
+    else:
+        load_time = time.perf_counter() - start - key_time
+        start = time.perf_counter()
+        # Faces that already carry a matching triangulation (ex. from cached
+        # parts) are not meshed again.
+        BRepMesh_IncrementalMesh(
+            shape.wrapped, tolerance, True, angular_tolerance, _parallel
+        )
+        build_time = time.perf_counter() - start
+        meta = {"type_name": "mesh", "build_time": build_time}
+        size, _stored = store.put(key, meta, shape.wrapped)
+        write_time = time.perf_counter() - start - build_time
+        _count_cache_stats(
+            "export (mesh)",
+            calls=1,
+            misses=1,
+            bytes_written=size,
+            key_time=key_time,
+            load_time=load_time,
+            build_time=build_time,
+            write_time=write_time,
+            saved_time=-key_time - load_time - write_time,
+        )
+
+
+def _copy_triangulation(src, dst):
+    """Attach face triangulations of TopoDS_Shape src to the faces of dst.
+
+    dst must have the same topology as src, ex. src was read back from dst's
+    serialization.
+    """
+    from OCP.BRep import BRep_Builder, BRep_Tool
+    from OCP.TopAbs import TopAbs_FACE
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS
+
+    builder = BRep_Builder()
+    src_faces = TopExp_Explorer(src, TopAbs_FACE)
+    dst_faces = TopExp_Explorer(dst, TopAbs_FACE)
+    while src_faces.More() and dst_faces.More():
+        face = TopoDS.Face_s(src_faces.Current())
+        triangulation = BRep_Tool.Triangulation_s(face, TopLoc_Location())
+        builder.UpdateFace(TopoDS.Face_s(dst_faces.Current()), triangulation)
+        src_faces.Next()
+        dst_faces.Next()
+
+
 @workplane_method
 def show(obj):
     """Call show_object, and prevent further show_object calls"""
-    frame = inspect.stack()[1]
-    show_object = frame.frame.f_globals.get("show_object")
+    return _show(obj, sys._getframe(1))
+
+
+def _show(obj, frame):
+    obj = _finish_clean(obj)
+    show_object = frame.f_globals.get("show_object")
     if show_object:
         show_object(obj)
-        frame.frame.f_globals["show_object"] = lambda _obj: None
+        frame.f_globals["show_object"] = lambda _obj: None
     return obj
 
 
@@ -349,11 +2657,8 @@ def cut_hexagon(obj, hex_radius=6, wall_thickness=1.4, border=1.4):
         border: Solid margin kept around outer edge.
     """
 
-    dx = (3**0.5) * hex_radius + wall_thickness
-    dy = 3.0 * hex_radius + (3**0.5) * wall_thickness
-
-    bbox = obj.val().BoundingBox()
-    face = sorted([(bbox.xlen, ">X"), (bbox.ylen, ">Y"), (bbox.zlen, ">Z")])[0][-1]
+    bbox = _bounding_box(obj.val())
+    face = _thinnest_face(bbox)
     match face:
         case ">Z":
             xlen, ylen = bbox.xlen, bbox.ylen
@@ -362,15 +2667,264 @@ def cut_hexagon(obj, hex_radius=6, wall_thickness=1.4, border=1.4):
         case _:
             xlen, ylen = bbox.xlen, bbox.zlen
 
-    ny = int(ylen / dy) + 2
+    whole, clipped = _hex_lattice(xlen, ylen, hex_radius, wall_thickness, border)
+    # Prisms through the whole object, like cutThruAll. Whole cells share one.
+    depth = bbox.DiagonalLength * 2
+    cell = _prism(_hexagon(hex_radius), depth)
+    tools = [_moved(cell, cq.Location(cq.Vector(x, y, 0))) for x, y in whole]
+    tools += [_prism(points, depth) for points in clipped]
+    plane = obj.faces(face).workplane().plane
+    return obj.cut_all([_moved(tool, plane.location) for tool in tools])
+
+
+def _thinnest_face(bbox):
+    """Selector of the face across the thinnest side of a bounding box."""
+    return sorted([(bbox.xlen, ">X"), (bbox.ylen, ">Y"), (bbox.zlen, ">Z")])[0][-1]
+
+
+def _prism(points, depth):
+    """Solid extruding the XY polygon points by depth, centered on Z=0."""
+    wire = cq.Wire.makePolygon([cq.Vector(x, y, 0) for x, y in points], close=True)
+    solid = cq.Solid.extrudeLinear(cq.Face.makeFromWires(wire), cq.Vector(0, 0, depth))
+    return _moved(solid, cq.Location(cq.Vector(0, 0, -depth / 2)))
+
+
+def _hexagon(r, x=0, y=0):
+    """Corners of the pointy-top hexagon of Sketch.regularPolygon(r, 6)."""
+    angles = [i * math.pi / 3 for i in range(6)]
+    return [(x + r * math.sin(a), y + r * math.cos(a)) for a in angles]
+
+
+def _hex_lattice(xlen, ylen, hex_radius, wall_thickness, border):
+    """Cells of the cut_hexagon lattice on a centered xlen by ylen face.
+
+    Returns the centers of the cells inside the border, and the corners of
+    the cells crossing it, clipped to it.
+    """
+    import numpy as np
+
+    dx = (3**0.5) * hex_radius + wall_thickness
+    dy = 3.0 * hex_radius + (3**0.5) * wall_thickness
+    # Two Sketch.rarray grids, the second moved by half a step.
     nx = int(xlen / dx) + 2
-    sketch_a = cq.Sketch().rarray(dx, dy, nx, ny).regularPolygon(hex_radius, 6, angle=0)
-    sketch_b = sketch_a.moved(cq.Location(cq.Vector(dx / 2, dy / 2, 0)))
-    limit_area = cq.Sketch().rect(xlen - border * 2, ylen - border * 2)
-    sketch_a = limit_area.face(sketch_a, mode="i")
-    limit_area = cq.Sketch().rect(xlen - border * 2, ylen - border * 2)
-    sketch_b = limit_area.face(sketch_b, mode="i")
-    return obj.faces(face).workplane().placeSketch(sketch_a, sketch_b).cutThruAll()
+    ny = int(ylen / dy) + 2
+    i, j = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+    grid = np.column_stack(
+        [(i.ravel() - (nx - 1) / 2) * dx, (j.ravel() - (ny - 1) / 2) * dy]
+    )
+    centers = np.concatenate([grid, grid + (dx / 2, dy / 2)])
+
+    limit = np.array([xlen / 2 - border, ylen / 2 - border])
+    half = np.array([hex_radius * 3**0.5 / 2, hex_radius])
+    distance = np.abs(centers)
+    inside = np.all(distance + half <= limit, axis=1)
+    crossing = ~inside & np.all(distance - half < limit, axis=1)
+
+    clipped = []
+    for x, y in centers[crossing]:
+        points = _hexagon(hex_radius, x, y)
+        for normal in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            points = _clip_polygon(points, normal, limit[abs(normal[1])])
+        if _polygon_area(points) > 1e-6:
+            clipped.append(points)
+    return centers[inside].tolist(), clipped
+
+
+def _clip_polygon(points, normal, limit):
+    """Part of a convex polygon where the dot product with normal is <= limit."""
+    nx, ny = normal
+    result = []
+    for p, q in zip(points, points[1:] + points[:1]):
+        a, b = nx * p[0] + ny * p[1] - limit, nx * q[0] + ny * q[1] - limit
+        if a <= 0:
+            result.append(p)
+        if a < 0 < b or b < 0 < a:
+            t = a / (a - b)
+            result.append((p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t))
+    return result
+
+
+def _polygon_area(points):
+    """Area of a simple polygon, by the shoelace formula."""
+    pairs = zip(points, points[1:] + points[:1])
+    return abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in pairs)) / 2
+
+
+@workplane_method
+def cut_lightweight(
+    obj,
+    cell_size=10,
+    wall_thickness=1.4,
+    border=2,
+    min_cell_size=None,
+    falloff=20,
+    keep=(),
+    seed=0,
+):
+    """Cut a Voronoi cell pattern from the thinnest face of a board-like object.
+
+    With min_cell_size, cells are smaller next to the holes of that face and
+    the kept objects, growing to cell_size over falloff. Cells closer than
+    border to the edges of the face, its holes or the kept objects are left
+    out.
+
+    Args:
+        obj: Target solid.
+        cell_size: Distance between cell centers away from holes.
+        wall_thickness: Gap between cells.
+        border: Solid margin kept around edges, holes and kept objects.
+        min_cell_size: Distance between cell centers next to holes and kept
+            objects. None: cell_size, for a uniform pattern.
+        falloff: Distance over which cells grow from min_cell_size to cell_size.
+        keep: Objects to keep solid walls around, ex. magnet slots.
+        seed: Random seed of the cell centers.
+    """
+    import numpy as np
+
+    bbox = _bounding_box(obj.val())
+    face = _thinnest_face(bbox)
+    plane = obj.faces(face).workplane().plane
+    to_local = plane.location.inverse
+    local = _bounding_box(_moved(obj.val(), to_local))
+    rect = (
+        local.xmin + border,
+        local.ymin + border,
+        local.xmax - border,
+        local.ymax - border,
+    )
+
+    # Points on the edges of the face and the outlines of the kept objects.
+    step = border / 2
+    faces = [_moved(f, to_local) for f in obj.faces(face).vals()]
+    edges = [e for f in faces for e in f.Edges()]
+    holes = [e for f in faces for w in f.innerWires() for e in w.Edges()]
+    keep_rects = []
+    shapes = [o for o in keep if isinstance(o, cq.Shape)]
+    shapes += [v for o in keep if isinstance(o, cq.Workplane) for v in o.vals()]
+    for shape in [v for v in shapes if isinstance(v, cq.Shape)]:
+        b = _bounding_box(_moved(shape, to_local))
+        keep_rects.append((b.xmin, b.ymin, b.xmax, b.ymax))
+        corners = [
+            (b.xmin, b.ymin),
+            (b.xmax, b.ymin),
+            (b.xmax, b.ymax),
+            (b.xmin, b.ymax),
+        ]
+        wire = cq.Wire.makePolygon([cq.Vector(x, y, 0) for x, y in corners], close=True)
+        holes += wire.Edges()
+    features = _sample_edges(holes, step)
+    outline = np.concatenate([_sample_edges(edges, step), features])
+
+    min_cell_size = min_cell_size or cell_size
+    centers = _graded_seeds(rect, cell_size, min_cell_size, falloff, features, seed)
+    cells = []
+    for points in _voronoi_cells(centers, rect, wall_thickness, cell_size * 3):
+        if _polygon_area(points) < wall_thickness**2:
+            continue
+        if _near_points(points, outline, border):
+            continue
+        if any(_inside_rect(points, r) for r in keep_rects):
+            continue
+        cells.append(points)
+
+    depth = bbox.DiagonalLength * 2
+    tools = [_moved(_prism(points, depth), plane.location) for points in cells]
+    return obj.cut_all(tools)
+
+
+def _sample_edges(edges, step):
+    """XY points along edges, at most step apart, as a (n, 2) array."""
+    import numpy as np
+
+    points = []
+    for edge in edges:
+        ts = np.linspace(0, 1, max(2, math.ceil(edge.Length() / step) + 1))
+        points += [(p.x, p.y) for p in edge.positions(ts)]
+    return np.array(points).reshape(-1, 2)
+
+
+def _graded_seeds(rect, cell_size, min_cell_size, falloff, features, seed):
+    """Cell centers in rect, about cell_size apart, closer near features.
+
+    Dart throwing on a jittered grid: a candidate is taken if no center
+    taken before is closer than the cell size at that candidate.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    x0, y0, x1, y1 = rect
+    step = min_cell_size / 2
+    xs, ys = np.meshgrid(np.arange(x0, x1, step), np.arange(y0, y1, step))
+    candidates = np.column_stack([xs.ravel(), ys.ravel()])
+    candidates += rng.uniform(0, step, candidates.shape)
+    candidates = candidates[rng.permutation(len(candidates))]
+
+    sizes = np.full(len(candidates), float(cell_size))
+    if len(features) and min_cell_size < cell_size:
+        distance = np.full(len(candidates), np.inf)
+        for start in range(0, len(features), 256):
+            chunk = features[start : start + 256]
+            d = np.hypot(
+                *(candidates[:, None, :] - chunk[None, :, :]).transpose(2, 0, 1)
+            )
+            distance = np.minimum(distance, d.min(axis=1))
+        ratio = np.clip(distance / falloff, 0, 1)
+        sizes = min_cell_size + (cell_size - min_cell_size) * ratio
+
+    taken = np.empty_like(candidates)
+    count = 0
+    for point, size in zip(candidates, sizes):
+        if count and np.min(np.hypot(*(taken[:count] - point).T)) < size:
+            continue
+        taken[count] = point
+        count += 1
+    return taken[:count]
+
+
+def _voronoi_cells(centers, rect, wall_thickness, reach):
+    """Voronoi cells of centers within rect, shrunk by wall_thickness / 2.
+
+    Only centers closer than reach are considered as neighbors.
+    """
+    import numpy as np
+
+    x0, y0, x1, y1 = rect
+    for center in centers:
+        offsets = centers - center
+        distance = np.hypot(*offsets.T)
+        points = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        for i in np.argsort(distance):
+            if distance[i] == 0 or distance[i] > reach or not points:
+                continue
+            normal = offsets[i] / distance[i]
+            limit = normal @ center + (distance[i] - wall_thickness) / 2
+            points = _clip_polygon(points, normal, limit)
+        if len(points) >= 3:
+            yield points
+
+
+def _near_points(polygon, points, distance):
+    """Whether any of the (n, 2) points is within distance of a convex polygon."""
+    import numpy as np
+
+    corners = np.array(polygon)
+    low, high = corners.min(axis=0) - distance, corners.max(axis=0) + distance
+    points = points[np.all((points > low) & (points < high), axis=1)]
+    if not len(points):
+        return False
+    # The largest distance outside of the edges. It is not more than the
+    # distance to the polygon, so cells might be left out near corners.
+    edges = np.roll(corners, -1, axis=0) - corners
+    normals = np.column_stack([edges[:, 1], -edges[:, 0]])
+    normals /= np.hypot(*normals.T)[:, None]
+    outside = (points @ normals.T - np.sum(normals * corners, axis=1)).max(axis=1)
+    return bool(np.any(outside < distance))
+
+
+def _inside_rect(polygon, rect):
+    """Whether any corner of polygon is inside rect (xmin, ymin, xmax, ymax)."""
+    x0, y0, x1, y1 = rect
+    return any(x0 < x < x1 and y0 < y < y1 for x, y in polygon)
 
 
 @workplane_method
@@ -383,20 +2937,15 @@ def surface_holes(obj, face=">Z", len=10):
         face: Face selector to read hole wires from.
         len: Extrusion length for hole solids.
     """
-    sketches = []
     obj_face = obj.faces(face)
-
-    # 用第一个 face 建立基准 plane
-    f0 = obj_face.val()
-    plane = cq.Workplane().newObject([f0]).workplane().plane
-
-    for f in obj_face.vals():
-        for w in f.innerWires():
-            fw = cq.Face.makeFromWires(w)
-            sketch = cq.Sketch(fw).finalize()
-            sketches.append(sketch)
-    wp = W(plane)
-    return W(wp.placeSketch(*sketches).extrude(len).val())
+    # Along the normal of the first face, as a workplane on it.
+    vec = obj_face.val().normalAt() * len
+    solids = [
+        cq.Solid.extrudeLinear(cq.Face.makeFromWires(w), vec)
+        for f in obj_face.vals()
+        for w in f.innerWires()
+    ]
+    return _workplane(cq.Compound.makeCompound(solids))
 
 
 @workplane_method
@@ -410,76 +2959,201 @@ def surface_grow(obj, face=">Z", length=10, skip_parts=None):
         skip_parts: set of indexes to skip, e.g. {0,1,2}
     """
     assert length > 0
-    obj = W(obj.val())
+    obj = _workplane(obj.val())
     sel = obj.faces(face)
 
     if sel.size() == 0:
         raise ValueError("No face selected")
 
-    objs = []
-
     vec = sel.workplane().plane.zDir * length
-    for i, val in enumerate(sel.vals()):
-        if skip_parts and i in skip_parts:
-            continue
-        solid = cq.Solid.extrudeLinear(val, vec)
-        objs.append(W(solid))
-
-    return union_all(objs)
+    faces = [f for i, f in enumerate(sel.vals()) if i not in (skip_parts or ())]
+    # Faces sharing no vertex grow into disjoint solids: no need to fuse them.
+    parts = []
+    for group in _connected_faces(faces):
+        solids = [cq.Solid.extrudeLinear(f, vec) for f in group]
+        shape = solids[0] if len(solids) == 1 else union_all(solids).val()
+        parts += list(shape) if isinstance(shape, cq.Compound) else [shape]
+    if len(parts) == 1:
+        return _workplane(parts[0])
+    return _workplane(cq.Compound.makeCompound(parts))
+
+
+def _connected_faces(faces):
+    """Group faces that share vertices, directly or through other faces."""
+    if len(faces) < 2:
+        return [faces] if faces else []
+    groups = []
+    for f in faces:
+        vertices = {v.hashCode() for v in f.Vertices()}
+        touching = [g for g in groups if g[0] & vertices]
+        for g in touching:
+            groups.remove(g)
+            vertices |= g[0]
+        groups.append((vertices, [x for g in touching for x in g[1]] + [f]))
+    return [g[1] for g in groups]
 
 
 @workplane_method
 def bbox(obj):
     """Return CadQuery BoundingBox for quick size/position checks.
 
+    The box is exact, and computed once per shape. See `_bounding_box`.
+
     Args:
         obj: Source object.
     """
-    return obj.val().BoundingBox()
+    return _bounding_box(obj.val())
 
 
 @workplane_method
 def measure(obj, axis: str | float | None = None):
     """Measure object size by axis.
 
-    axis can be "X", "Y", "Z", "X Y Z", or a numeric string.
+    axis can be "X", "Y", "Z", a number, or a list of those like "X Y Z" or
+    "X Y 4" (numbers are returned as is).
 
     Args:
         obj: Source object.
         axis: Axis selector, axis list, or numeric literal.
     """
-    bbox = obj.val().BoundingBox()
-    if isinstance(axis, float):
+    if isinstance(axis, (int, float)):
+        return float(axis)
+    box = _bounding_box(obj.val())
+    lengths = {"X": box.xlen, "Y": box.ylen, "Z": box.zlen}
+
+    def length(name):
+        if name.upper() in lengths:
+            return lengths[name.upper()]
         try:
-            return float(axis)
+            return float(name)
         except ValueError:
-            pass
-    elif axis is None:
-        return (bbox.xlen, bbox.ylen, bbox.zlen)
-    elif isinstance(axis, str):
-        match axis.upper():
-            case "X":
-                return bbox.xlen
-            case "Y":
-                return bbox.ylen
-            case "Z":
-                return bbox.zlen
-            case _:
-                return [measure(obj, a) for a in axis.split()]
-    else:
-        raise TypeError(f"unexpected {axis=}")
+            raise ValueError(f"unexpected axis {name!r}") from None
+
+    match axis:
+        case None:
+            return (box.xlen, box.ylen, box.zlen)
+        case str() if len(axis.split()) == 1:
+            return length(axis.strip())
+        case str():
+            return [length(a) for a in axis.split()]
+    raise TypeError(f"unexpected {axis=}")
 
 
 @workplane_method
 def cut_inner_box(obj, face, thickness=1):
     """Shell from a selected face to make a hollow box-like body (shell: 抽壳).
 
+    Prisms along the normal of the face, such as boxes, are hollowed by
+    building the inner faces directly instead of the slower OCCT shell.
+
     Args:
         obj: Source solid.
         face: Face selector where shell starts.
         thickness: Wall thickness.
     """
-    return W(obj.val()).faces(face).shell(-thickness)
+    obj = W(obj.val())
+    hollow = _hollow_prism(obj.val(), obj.faces(face).vals(), thickness)
+    if hollow is None:
+        return obj.faces(face).shell(-thickness)
+    return W(hollow)
+
+
+def _hollow_prism(solid, faces, thickness):
+    """solid.shell(-thickness) opened at faces, for prisms.
+
+    Returns None unless thickness is positive (a negative one grows the
+    walls outwards) and solid is a prism along the normal of a single planar
+    face in faces: its other faces are the opposite face and sides parallel
+    to the normal, and neither end has holes. The result keeps the faces of
+    solid, except the open one which becomes a rim around the faces of an
+    inner prism, so no boolean or offset of the solid is needed.
+    """
+    from OCP.BRep import BRep_Builder
+    from OCP.BRepAdaptor import BRepAdaptor_Surface
+    from OCP.BRepBuilderAPI import BRepBuilderAPI_MakeFace
+    from OCP.BRepLib import BRepLib
+    from OCP.BRepPrimAPI import BRepPrimAPI_MakePrism
+    from OCP.GeomAbs import GeomAbs_SurfaceType
+    from OCP.ShapeFix import ShapeFix_Face
+    from OCP.TopAbs import TopAbs_REVERSED
+    from OCP.TopoDS import TopoDS, TopoDS_Shell, TopoDS_Solid
+
+    solids = [solid] if isinstance(solid, cq.Solid) else solid.Solids()
+    if thickness <= 0 or len(solids) != 1 or len(faces) != 1:
+        return None
+    solid, top = solids[0], faces[0]
+    solid_faces = solid.Faces()
+    if top.geomType() != "PLANE" or top.innerWires():
+        return None
+    normal = top.normalAt().toDir()
+
+    def kind(f):
+        """How the face f lies along normal: "bottom", "side" or None."""
+        surface = BRepAdaptor_Surface(f.wrapped)
+        match surface.GetType():
+            case GeomAbs_SurfaceType.GeomAbs_Plane:
+                # Same as Face.normalAt(), without measuring the face.
+                pos = surface.Plane().Position()
+                d = pos.XDirection().Crossed(pos.YDirection())
+                if f.wrapped.Orientation() == TopAbs_REVERSED:
+                    d.Reverse()
+                if d.IsOpposite(normal, 1e-9):
+                    return "bottom"
+                if d.IsNormal(normal, 1e-9):
+                    return "side"
+            case GeomAbs_SurfaceType.GeomAbs_Cylinder:
+                if surface.Cylinder().Axis().Direction().IsParallel(normal, 1e-9):
+                    return "side"
+        return None
+
+    bottoms = []
+    for f in solid_faces:
+        if f.isSame(top):
+            continue
+        match kind(f):
+            case "bottom":
+                bottoms.append(f)
+            case "side":
+                pass
+            case _:
+                return None
+    if len(bottoms) != 1 or bottoms[0].innerWires():
+        return None
+    points = [
+        BRepAdaptor_Surface(f.wrapped).Plane().Location() for f in (top, bottoms[0])
+    ]
+    height = cq.Vector(normal).dot(cq.Vector(points[0]) - cq.Vector(points[1]))
+    if height <= thickness:
+        return None
+    wires = top.outerWire().offset2D(-thickness)
+    if len(wires) != 1:
+        return None
+
+    # The inner prism, from the open face down to thickness above the
+    # opposite face. Its side and bottom faces, reversed, face the cavity.
+    base = cq.Face.makeFromWires(wires[0]).wrapped
+    depth = cq.Vector(normal) * -(height - thickness)
+    prism = BRepPrimAPI_MakePrism(base, depth.wrapped)
+    rim = BRepBuilderAPI_MakeFace(top.wrapped)
+    rim.Add(TopoDS.Wire_s(cq.Face(prism.FirstShape()).outerWire().wrapped.Reversed()))
+    # Orient the hole against the outline.
+    fix = ShapeFix_Face(rim.Face())
+    fix.FixOrientation()
+    fix.Perform()
+
+    builder = BRep_Builder()
+    shell = TopoDS_Shell()
+    builder.MakeShell(shell)
+    for f in solid_faces:
+        builder.Add(shell, fix.Face() if f.isSame(top) else f.wrapped)
+    for f in cq.Shape.cast(prism.Shape()).Faces():
+        if not f.wrapped.IsSame(prism.FirstShape()):
+            builder.Add(shell, f.wrapped.Reversed())
+    result = TopoDS_Solid()
+    builder.MakeSolid(result)
+    builder.Add(result, shell)
+    BRepLib.OrientClosedSolid_s(result)
+    return cq.Solid(result)
 
 
 @workplane_method
@@ -511,15 +3185,93 @@ def sector(radius=10, thick=2, angle=90):
         thick: Radial thickness.
         angle: Sweep angle in degrees.
     """
-    return (
-        W("XZ")
-        .moveTo(radius, 0)
-        .lineTo(radius, thick)
-        .lineTo(0, thick)
-        .lineTo(0, 0)
-        .close()
-        .revolve(angle)
-    )
+    return annular_sector(0, radius, thick, angle).translate((0, 0, thick / 2))
+
+
+@_primitive
+def annular_sector(inner_radius, outer_radius, height, angle=90):
+    """Create a ring sector by revolving its profile, without booleans.
+
+    The sector starts at +X and turns counterclockwise around Z. It is
+    centered on Z=0 like Workplane.cylinder.
+
+    Args:
+        inner_radius: Inner radius, 0 for a pie slice.
+        outer_radius: Outer radius.
+        height: Height along Z.
+        angle: Sweep angle in degrees.
+    """
+    z = height / 2
+    points = [
+        (inner_radius, -z),
+        (outer_radius, -z),
+        (outer_radius, z),
+        (inner_radius, z),
+    ]
+    wire = cq.Wire.makePolygon([cq.Vector(r, 0, h) for r, h in points], close=True)
+    return cq.Solid.revolve(wire, [], angle, cq.Vector(), cq.Vector(0, 0, 1))
+
+
+@_primitive
+def profile_box(length, width, height, corners=None, axis="Z"):
+    """Create a box with rounded or chamfered edges along axis, by extruding
+    its profile instead of selecting edges to fillet or chamfer.
+
+    corners maps a corner of the profile, like "<X<Y" for axis "Z", to a
+    fillet radius, or to an (a, b) chamfer cutting a along the first axis
+    of the profile and b along the second. Centered like Workplane.box.
+
+    Args:
+        length: Size along X.
+        width: Size along Y.
+        height: Size along Z.
+        corners: Dict of corner to fillet radius or chamfer lengths.
+        axis: Axis of the rounded or chamfered edges.
+    """
+    u_axis, v_axis = "XYZ".replace(axis, "")
+    size = dict(zip("XYZ", (length, width, height)))
+    a, b = size[u_axis] / 2, size[v_axis] / 2
+    cuts = {}
+    for name, cut in (corners or {}).items():
+        signs = {c: -1 if s == "<" else 1 for s, c in zip(name[::2], name[1::2])}
+        if len(name) != 4 or sorted(signs) != [u_axis, v_axis]:
+            raise ValueError(f"corner {name!r} is not like '<{u_axis}<{v_axis}'")
+        cuts[signs[u_axis], signs[v_axis]] = cut
+
+    def point(u, v):
+        coords = {u_axis: u, v_axis: v, axis: -size[axis] / 2}
+        return cq.Vector(coords["X"], coords["Y"], coords["Z"])
+
+    edges = []
+
+    def line(p, q):
+        if (p - q).Length > 1e-9:
+            edges.append(cq.Edge.makeLine(p, q))
+
+    # Counterclockwise, so the edge into corners 0 and 2 runs along v.
+    first = previous = None
+    for i, (su, sv) in enumerate([(-1, -1), (1, -1), (1, 1), (-1, 1)]):
+        cu, cv = su * a, sv * b
+        cut = cuts.get((su, sv)) or 0
+        du, dv = cut if isinstance(cut, tuple) else (cut, cut)
+        start, end = point(cu, cv - sv * dv), point(cu - su * du, cv)
+        if i % 2:
+            start, end = end, start
+        if previous is None:
+            first = start
+        else:
+            line(previous, start)
+        if isinstance(cut, tuple) or not cut:
+            line(start, end)
+        else:
+            d = cut * (1 - math.sqrt(0.5))
+            mid = point(cu - su * d, cv - sv * d)
+            edges.append(cq.Edge.makeThreePointArc(start, mid, end))
+        previous = end
+    line(previous, first)
+    face = cq.Face.makeFromWires(cq.Wire.assembleEdges(edges))
+    depth = cq.Vector(*(size[axis] if c == axis else 0 for c in "XYZ"))
+    return cq.Solid.extrudeLinear(face, depth)
 
 
 @cq_cache
@@ -550,7 +3302,8 @@ def connect_obj(
     d2 = d * math.tan(math.radians(30))
 
     def get_obj(w, h, dthick: float = 0):
-        return W().box(w, thick + dthick, h).edges("<Y").edges("|Z").chamfer(d, d2)
+        chamfer = (d2, d)
+        return profile_box(w, thick + dthick, h, {"<X<Y": chamfer, ">X<Y": chamfer})
 
     b_inner = get_obj(width, height)
     outer_width = width + (edge_outline - d2 / 2) * 2
@@ -594,6 +3347,7 @@ def hollow_box(size=10, thickness=0.0001):
     return b
 
 
+@_primitive
 def trapezoid(x, y, z, dx1=None, dx2=None, degree=30):
     """Extrude a vertical trapezoid profile.
 
@@ -621,7 +3375,8 @@ def trapezoid(x, y, z, dx1=None, dx2=None, degree=30):
     ]
     if x > 0:
         coordinates.append((-x / 2, y))
-    return W("XY").polyline(coordinates).close().extrude(z)
+    wire = cq.Wire.makePolygon([cq.Vector(u, v, 0) for u, v in coordinates], close=True)
+    return cq.Solid.extrudeLinear(cq.Face.makeFromWires(wire), cq.Vector(0, 0, z))
 
 
 if typing.TYPE_CHECKING:
@@ -694,6 +3449,9 @@ if typing.TYPE_CHECKING:
         #     cog.outl(f"{indent}    return {fn.name}(self{', ' if call_args else ''}{call_args})")
         #     cog.outl("")
         # ]]]
+        def cut_all(self, tools, exact=False, clean=True):
+            return cut_all(self, tools, exact, clean)
+
         def align(
             self, obj2=None, faces="", dx: float = 0, dy: float = 0, dz: float = 0
         ):
@@ -705,6 +3463,9 @@ if typing.TYPE_CHECKING:
         def repeat(self, n, x=0, y=0, z=0):
             return repeat(self, n, x, y, z)
 
+        def pattern(self, locations):
+            return pattern(self, locations)
+
         def export(self, part=None, filename=None, print_from_face="<Z"):
             return export(self, part, filename, print_from_face)
 
@@ -714,6 +3475,27 @@ if typing.TYPE_CHECKING:
         def cut_hexagon(self, hex_radius=6, wall_thickness=1.4, border=1.4):
             return cut_hexagon(self, hex_radius, wall_thickness, border)
 
+        def cut_lightweight(
+            self,
+            cell_size=10,
+            wall_thickness=1.4,
+            border=2,
+            min_cell_size=None,
+            falloff=20,
+            keep=(),
+            seed=0,
+        ):
+            return cut_lightweight(
+                self,
+                cell_size,
+                wall_thickness,
+                border,
+                min_cell_size,
+                falloff,
+                keep,
+                seed,
+            )
+
         def surface_holes(self, face=">Z", len=10):
             return surface_holes(self, face, len)
 
@@ -736,3 +3518,18 @@ if typing.TYPE_CHECKING:
 
 else:
     W = cq.Workplane
+
+
+if __name__ == "__main__":
+    match sys.argv[1:]:
+        case ["stats"]:
+            for name, value in cache_store().stats().items():
+                print(f"{name}: {value}")
+        case ["gc"]:
+            print(f"evicted {cache_store().gc()} entries")
+        case ["boolean-worker"]:
+            boolean_timeout(0)
+            _serve_booleans(sys.stdin.buffer, sys.stdout.buffer)
+        case _:
+            print(f"usage: {sys.argv[0]} stats|gc")
+            sys.exit(1)
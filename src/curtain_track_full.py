@@ -12,7 +12,7 @@ from functools import partial
 
 def center(obj, x=None, y=None, z=None):
     # 0: center, -1: edge, 1: edge
-    bbox = obj.val().BoundingBox()
+    bbox = obj.bbox()
     x_offset = y_offset = z_offset = 0
     if x is not None:
         x_offset = -(bbox.xmax + bbox.xmin) / 2
@@ -30,12 +30,7 @@ W = Workplane()
 
 
 def create_solid_quarter_ring(inner_radius, width, height):
-    radius = inner_radius + width
-    w = Workplane()
-    box = w.center(radius / 2, radius / 2).box(radius, radius, height)
-    outer = w.cylinder(height, radius)
-    inner = w.cylinder(height, inner_radius)
-    return outer.intersect(box).cut(inner)
+    return annular_sector(inner_radius, inner_radius + width, height)
 
 
 def create_quarter_frame(
@@ -93,7 +88,7 @@ def create_quarter_frame(
             )
             .rotate((0, 0, 0), (0, 0, 1), a)
         )
-    return ring1.cut(ring2t).cut(ring3).cut(ring4).union(union_all(s))
+    return union_all([ring1.cut_all([ring2t, ring3, ring4])] + s)
 
 
 def render():
@@ -179,7 +174,7 @@ def connector_full(
     bslot = W.box(
         slot, height / 2, length + outer_length, centered=(True, True, False)
     ).translate((0, height / 2, 0))
-    objs = [b1.cut(b2).cut(b3).cut(bslot)]
+    objs = [b1.cut_all([b2, b3, bslot])]
     if slot_pad:
         slot_pad_height = wall_height * 2 / 3
         s1 = W.box(
@@ -192,6 +187,8 @@ def connector_full(
         s3 = s1.translate((-(slot / 2 - slot_pad / 2), 0, 0))
         objs += [s2, s3]
     if screw:
+        rings = []
+        holes = []
         for i in range(screw):
             z = length + outer_length / (screw + 1) * (i + 1)
             c1 = (
@@ -205,7 +202,12 @@ def connector_full(
                 .translate((0, 0, z))
             )
             c3 = Workplane("YZ").cylinder(width, 4 / 2).translate((0, 0, z))
-            objs = [union_all(objs + [c2.cut(c3)]).cut(c1)]
+            rings.append(c2.cut(c3))
+            holes.append(c1)
+        # Cut all holes after adding all rings, instead of one screw at a time.
+        # The same as long as a hole (r=0.9) does not reach the ring (r=2) of
+        # the next screw, i.e. screws are over 2.9 apart (7.5 by default).
+        objs = [union_all(objs + rings).cut_all(holes)]
     if thin_inner:
         # thin inner border
         lside_thin_end = 0.5
@@ -9,16 +9,12 @@ def get_obj(
     slot_length = (r1 - r2) / 2 + slot_width * 2
     pos_inner = r2 + (r1 - r2) / 4
     pos_outer = r2 + (r1 - r2) * 3 / 4
-    g1 = (
-        W()
-        .polarArray(pos_inner, startAngle=0, angle=360, count=n, rotate=True)
-        .slot2D(slot_length, slot_width, angle=45)
-        .polarArray(pos_outer, startAngle=0, angle=360, count=n, rotate=True)
-        .slot2D(slot_length + d1, slot_width, angle=-45)
-        .extrude(w1 - thick * (top and 1 or 2))
-    )
+    h = w1 - thick * (top and 1 or 2)
+    inner = W().center(pos_inner, 0).slot2D(slot_length, slot_width, angle=45)
+    outer = W().center(pos_outer, 0).slot2D(slot_length + d1, slot_width, angle=-45)
+    g1 = inner.extrude(h).add(outer.extrude(h)).pattern(polar_locations(n))
     c1 = c1.faces(">Z").fillet(3)
-    obj = c1.cut(g1.align(c1, ">Z", dz=(0 if top else -thick)))
+    obj = c1.cut_all([g1.align(c1, ">Z", dz=(0 if top else -thick))])
     c2 = W().cylinder(w1, r2)
     obj = obj.cut(c2.align(c1, ">Z", dz=-top))
     return obj
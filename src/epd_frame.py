@@ -16,10 +16,19 @@ The current version uses multiple parts that fit the build plate to print horizo
 import math
 from functools import partial
 
-from cqutils import W, connect_obj, import_part, sector, union_all
+from cqutils import (
+    W,
+    connect_obj,
+    cq_cache,
+    import_part,
+    polar_locations,
+    sector,
+    union_all,
+)
 from magnet import magnet_2_10_20
 
 
+@cq_cache
 def rotation_mounting_plate_10cm():
     # 4 medium-sized strips; modify as needed
     WIDTH = 63 - 0.2 - 0.3
@@ -68,12 +77,11 @@ def rotation_mounting_plate_10cm():
 
         u2 = u_shape(R1 + 0.2, thick, chamfer=True).align(bu, "<Y")
         u2z = u2.surface_grow(">Z", bu.measure("Z"))
-        obj = obj.cut(u2).cut(u2z)
+        obj = obj.cut_all([u2, u2z])
 
         m_edge = 4
         m1e = m1.align(u1, "<Y >Z", dz=-m_edge)
-        for angle in range(0, 360, 90):
-            obj = obj.cut(m1e.rotate_axis("Y", angle))
+        obj = obj.cut_all([m1e.pattern(polar_locations(4, "Y"))])
 
         m1x_dz = math.sqrt(2) * (bu.measure("Z") - m1.measure("Z")) / 2 - m_edge
         # print(f"{m1x_dz=} {bu.measure("Z")=} {m1.measure("Z")=}")
@@ -83,8 +91,7 @@ def rotation_mounting_plate_10cm():
             .align(bu, "<Y -Z", dz=m1x_dz)
         )
 
-        for angle in [135, 225]:
-            obj = obj.cut(m1x.rotate_axis("Y", angle))
+        obj = obj.cut_all([m1x.pattern(polar_locations(2, "Y", 90, start=135))])
 
         c1 = W().cylinder(thick * 2, 2).rotate_axis("X", 90)
         obj = obj.cut(c1)
@@ -119,10 +126,8 @@ def rotation_mounting_plate_10cm():
 
         m_edge = 4
         m1e = m1.align(u1, "<Y >Z", dz=-m_edge)
-        for angle in range(0, 360, 90):
-            m1r = m1e.rotate_axis("Y", angle)
-            obj = obj.cut(m1r)
-            obj = obj.cut(m1r.surface_grow("<Y", u2.measure("Y")))
+        m1r = [m1e.rotate_axis("Y", a) for a in range(0, 360, 90)]
+        obj = obj.cut_all(m1r + [m.surface_grow("<Y", u2.measure("Y")) for m in m1r])
 
         b_reel = W().box(reel_l, reel_w, reel_w)  # to cut
         b2 = (
@@ -142,8 +147,7 @@ def rotation_mounting_plate_10cm():
         for angle in [90, 45]:
             obj = obj.union(b2.rotate_axis("Y", angle))
             obj = obj.cut(b_reelx.rotate_axis("Y", angle))
-        for angle in [90, 75, 60, 45]:
-            obj = obj.cut(b_wire_hole.rotate_axis("Y", angle))
+        obj = obj.cut_all(b_wire_hole.rotate_axis("Y", a) for a in [90, 75, 60, 45])
         u3 = u_shape(R1 + 2, 1.4, top_right=True).align(u2, "<Y")
         obj = obj.cut(u3.cut(u2))
         c1 = W().cylinder(obj.measure("Y"), 2).rotate_axis("X", 90).align(obj, "<Y")
@@ -151,15 +155,15 @@ def rotation_mounting_plate_10cm():
         return obj
 
     return {
-        "female": plate_female,
-        "male": plate_male,
+        "female": plate_female(),
+        "male": plate_male(),
     }
 
 
 MOUNTING_PLATE = rotation_mounting_plate_10cm()
 
 
-# @cq_cache
+@cq_cache
 def render(demo_sep=10):
     display_width = 211
     display_height = 287
@@ -182,7 +186,7 @@ def render(demo_sep=10):
         bottom_cable_height + front_border_bottom + surface_thickness * 2
     )
 
-    # @cq_cache
+    @cq_cache
     def get_bottom_obj():
         bar = (
             W()
@@ -194,7 +198,7 @@ def render(demo_sep=10):
             W().box(10, whole_thickness, bottom_cable_height + 3).align(bar, ":>Z <X")
         )
         corner2 = corner1.align(bar, ">X")
-        obj = bar.union(corner1).union(corner2)
+        obj = union_all([bar, corner1, corner2])
         connect_left = connect(kind=0).rotate_axis("Z", 270).align(bar, "<X >Y <Z")
         connect_left_cut = connect(kind=2).rotate_axis("Z", 270).align(bar, "<X >Y <Z")
         obj = obj.union(connect_left).cut(connect_left_cut)
@@ -202,7 +206,7 @@ def render(demo_sep=10):
         connect_right_cut = connect(kind=2).rotate_axis("Z", 90).align(bar, ">X >Y <Z")
         obj = obj.union(connect_right).cut(connect_right_cut)
         plate = W().box(display_width, front_thickness, bottom_plate_height)
-        obj = obj.union(plate.align(bar, "<Y <Z")).union(plate.align(bar, ">Y <Z"))
+        obj = union_all([obj, plate.align(bar, "<Y <Z"), plate.align(bar, ">Y <Z")])
         cut_front = W().box(
             front_border_width, front_thickness + 0.2, bottom_plate_height
         )
@@ -273,7 +277,7 @@ def render(demo_sep=10):
         right.translate((demo_sep, 0, 0)),
     ]
 
-    # @cq_cache
+    @cq_cache
     def get_top_obj():
         bar = (
             W()
@@ -320,8 +324,8 @@ def render(demo_sep=10):
 
     def get_rotate90_obj():
         # r90 = import_part("command_strip_plate.py", "rotate90-male")
-        r90 = MOUNTING_PLATE["male"]()
-        r90_outer = MOUNTING_PLATE["female"]()
+        r90 = MOUNTING_PLATE["male"]
+        r90_outer = MOUNTING_PLATE["female"]
         thick = r90_outer.measure("Y") / 2
         conn = connect(kind=0).rotate_axis("Z", 270).rotate_axis("X", 180)
         conn2 = connect(kind=2).rotate_axis("Z", 270).rotate_axis("X", 180)
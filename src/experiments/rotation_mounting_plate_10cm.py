@@ -59,12 +59,11 @@ def plate_female():
 
     u2 = u_shape(R1 + 0.2, thick, chamfer=True).align(bu, "<Y")
     u2z = u2.surface_grow(">Z", bu.measure("Z"))
-    obj = obj.cut(u2).cut(u2z)
+    obj = obj.cut_all([u2, u2z])
 
     m_edge = 4
     m1e = m1.align(u1, "<Y >Z", dz=-m_edge)
-    for angle in range(0, 360, 90):
-        obj = obj.cut(m1e.rotate_axis("Y", angle))
+    obj = obj.cut_all([m1e.pattern(polar_locations(4, "Y"))])
 
     m1x_dz = math.sqrt(2) * (bu.measure("Z") - m1.measure("Z")) / 2 - m_edge
     # print(f"{m1x_dz=} {bu.measure("Z")=} {m1.measure("Z")=}")
@@ -74,8 +73,7 @@ def plate_female():
         .align(bu, "<Y -Z", dz=m1x_dz)
     )
 
-    for angle in [135, 225]:
-        obj = obj.cut(m1x.rotate_axis("Y", angle))
+    obj = obj.cut_all([m1x.pattern(polar_locations(2, "Y", 90, start=135))])
 
     c1 = W().cylinder(thick * 2, 2).rotate_axis("X", 90)
     obj = obj.cut(c1)
@@ -109,10 +107,8 @@ def plate_male():
 
     m_edge = 4
     m1e = m1.align(u1, "<Y >Z", dz=-m_edge)
-    for angle in range(0, 360, 90):
-        m1r = m1e.rotate_axis("Y", angle)
-        obj = obj.cut(m1r)
-        obj = obj.cut(m1r.surface_grow("<Y", u2.measure("Y")))
+    m1r = [m1e.rotate_axis("Y", a) for a in range(0, 360, 90)]
+    obj = obj.cut_all(m1r + [m.surface_grow("<Y", u2.measure("Y")) for m in m1r])
 
     b_reel = W().box(reel_l, reel_w, reel_w)  # to cut
     b2 = (
@@ -132,8 +128,7 @@ def plate_male():
     for angle in [90, 45]:
         obj = obj.union(b2.rotate_axis("Y", angle))
         obj = obj.cut(b_reelx.rotate_axis("Y", angle))
-    for angle in [90, 75, 60, 45]:
-        obj = obj.cut(b_wire_hole.rotate_axis("Y", angle))
+    obj = obj.cut_all(b_wire_hole.rotate_axis("Y", a) for a in [90, 75, 60, 45])
     u3 = u_shape(R1 + 2, 1.4, top_right=True).align(u2, "<Y")
     obj = obj.cut(u3.cut(u2))
     c1 = W().cylinder(obj.measure("Y"), 2).rotate_axis("X", 90).align(obj, "<Y")
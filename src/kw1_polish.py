@@ -28,7 +28,7 @@ import os
 
 def center(obj, x=None, y=None, z=None):
     # 0: center, -1: edge, 1: edge
-    bbox = obj.val().BoundingBox()
+    bbox = obj.bbox()
     x_offset = y_offset = z_offset = 0
     if x is not None:
         x_offset = -(bbox.xmax + bbox.xmin) / 2
@@ -46,7 +46,7 @@ W = cq.Workplane()
 
 
 def container2(obj, pad=1, outer_pad=2, round_corner=8):
-    bbox = obj.val().BoundingBox()
+    bbox = obj.bbox()
     b3 = (
         W.box(bbox.xlen, bbox.ylen + outer_pad * 2, bbox.zlen + outer_pad * 2)
         .edges("|X")
@@ -89,7 +89,7 @@ def render():
     ks = center(k1a.union(k1b), x=0, y=0, z=0)
     kc = container2(ks)
 
-    bbox = kc.val().BoundingBox()
+    bbox = kc.bbox()
     c_thick = 0.6
     c0 = W.box(bbox.xlen, c_thick, bbox.zlen * 0.56)
     c1 = c0.translate((0, -10, bbox.zlen * 0.2))
@@ -6,14 +6,8 @@ from functools import partial
 def _magnet(
     m_w, m_h, m_t, hole_depth=1, c1a=0.4, c1b=1.0, c2=0.6, thick=None, round_hole=None
 ):
-    obj = b = (
-        W()
-        .box(m_w, m_t, m_h)
-        .edges("|X and <Z and <Y")
-        .chamfer(c1a, c2)
-        .edges("|X and <Z and >Y")
-        .chamfer(c1b, c2)
-    )
+    corners = {"<Y<Z": (c2, c1a), ">Y<Z": (c1b, c2)}
+    obj = b = profile_box(m_w, m_t, m_h, corners, axis="X")
     if thick is not None:
         hole_depth = thick - m_h
         assert hole_depth > 0
@@ -60,10 +60,10 @@ m2bc = m2b.solid_box(y=thick1).align(b1, ">Y", dx=2)
 
 @cq_cache
 def interna1_obj(fit_internal_depth=True):
-    obj = b1h
-    obj = obj.union(union_all([m1ac, m1bc, m2ac, m2bc])).cut(
-        union_all([m1a, m1b, m2a, m2b])
-    )
+    # Lazy: the repeated union and cut of the magnet slots run once.
+    slots = [m1ac, m1bc, m2ac, m2bc]
+    magnets = [m1a, m1b, m2a, m2b]
+    obj = lazy(b1h).union(*slots).cut(*magnets)
 
     obj = obj.cut(c1a)
     c1c = c1b
@@ -71,9 +71,7 @@ def interna1_obj(fit_internal_depth=True):
         internal_depth = 17
         c1c = c1c.cut(c1b.solid_box().translate((0, -(internal_depth - thick1), 0)))
     obj = obj.union(c1c)
-    obj = obj.union(union_all([m1ac, m1bc, m2ac, m2bc])).cut(
-        union_all([m1a, m1b, m2a, m2b])
-    )
+    obj = obj.union(*slots).cut(*magnets)
     return obj
 
 
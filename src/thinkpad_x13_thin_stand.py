@@ -64,7 +64,6 @@ def render():
     o3 = loft(z9 * 2, z9 * 2, 0, y3, c2=z2 - z1).translate((0, 0, bz))
     b2 = b1all.intersect(o3)
 
-    slots = []
     x_pad = 2
     y_pad = 2
     w_step = (width - x_pad) / (n)
@@ -75,14 +74,9 @@ def render():
     b_slot2 = W.box(
         w_slot, (y4 - y3) - y_pad * 2, z1 * 20, centered=(True, False, True)
     ).translate((-(width - x_pad) / 2 + w_step / 2, y3 + y_pad, 0))
-    for i in range(n):
-        slots += [
-            b_slot.translate((i * w_step, 0, 0)),
-            b_slot2.translate((i * w_step, 0, 0)),
-        ]
-    obj_slot = union_all(slots)
-
-    objs += [o1f.cut(b2).cut(obj_slot)]
+    steps = linear_locations(n, x=w_step, centered=False)
+    slots = [b_slot.pattern(steps), b_slot2.pattern(steps)]
+    objs += [o1f.cut_all([b2] + slots)]
 
     return union_all(objs)
 